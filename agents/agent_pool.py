@@ -0,0 +1,75 @@
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from agents.analysis_agent import AnalysisAgent
+from agents.coordinator import MEMORY_OPTIONS, Coordinator
+from agents.memory_agent import MemoryAgent
+from agents.research_agent import ResearchAgent
+from agents.session_manager import SessionManager
+
+
+class AgentPool:
+    """
+    Process-wide registry that builds each heavyweight resource once.
+    - get() is double-checked: the warm path is a dict lookup without the lock, and
+      concurrent first calls build a resource only once
+    - Cold build times (including nested resources) and warm lookup counts/times
+      are kept per resource; the counters have their own lock, so warm lookups never
+      wait behind a cold build
+    """
+
+    def __init__(self):
+        self._resources = {}
+        # Reentrant: building the coordinator builds its agents through get()
+        self._lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self.timings = {}
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        resource = self._resources.get(name)
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(name)
+                if resource is None:
+                    resource = factory()
+                    with self._stats_lock:
+                        self.timings[name] = {"cold_seconds": time.perf_counter() - start,
+                                              "warm_hits": 0, "warm_seconds": 0.0}
+                    self._resources[name] = resource
+                    return resource
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            stats = self.timings[name]
+            stats["warm_hits"] += 1
+            stats["warm_seconds"] = elapsed
+        return resource
+
+    def research_agent(self) -> ResearchAgent:
+        return self.get("research_agent", ResearchAgent)
+
+    def analysis_agent(self) -> AnalysisAgent:
+        return self.get("analysis_agent", AnalysisAgent)
+
+    def memory_agent(self) -> MemoryAgent:
+        return self.get("memory_agent", lambda: MemoryAgent(**MEMORY_OPTIONS))
+
+    def coordinator(self) -> Coordinator:
+        return self.get("coordinator", lambda: Coordinator(self.research_agent(), self.analysis_agent(),
+                                                           self.memory_agent()))
+
+    def session_manager(self) -> SessionManager:
+        return self.get("session_manager", lambda: SessionManager(self.coordinator()))
+
+    def timing_report(self) -> Dict[str, Dict[str, float]]:
+        with self._stats_lock:
+            return {name: dict(stats) for name, stats in self.timings.items()}
+
+
+_POOL = AgentPool()
+
+
+def get_pool() -> AgentPool:
+    # The module is imported once per process, so Streamlit reruns reuse the same pool
+    return _POOL
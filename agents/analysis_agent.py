@@ -1,7 +1,21 @@
+import itertools
+from types import MappingProxyType
+from typing import Mapping
+
+import numpy as np
+
+from agents.async_support import run_blocking
+from agents.comparison_engine import MetricMatrix
+from agents.analysis_result import AnalysisResult, compared_item, copy_comparisons, item_names
+from agents.keyword_matcher import KeywordMatcher
+from agents.query_cache import QueryCache
+
+
 class AnalysisAgent:
     def __init__(self):
         self.analysis_count = 0
-        self.comparison_metrics = {
+        self._analysis_ids = itertools.count(1)
+        comparison_metrics = {
             "neural_networks": {
                 "CNN": {"speed": 8, "accuracy": 9, "interpretability": 5, "complexity": 7, "use_cases": "Images, Vision"},
                 "RNN": {"speed": 6, "accuracy": 7, "interpretability": 4, "complexity": 7, "use_cases": "Sequences, Time-series"},
@@ -18,101 +32,133 @@ class AnalysisAgent:
                 "Nadam": {"convergence": 9, "speed": 8, "stability": 8, "memory": 6, "best_for": "Adam with momentum"}
             }
         }
+        # One metric matrix per domain; comparisons select rows instead of walking dicts.
+        # Matrices and detection tables follow the registry, which only add_metrics() changes
+        self._metrics = {}
+        self._engines = {}
+        self.engines = MappingProxyType(self._engines)
+        for domain, rows in comparison_metrics.items():
+            self._set_rows(domain, rows)
+        self._build_detection()
+        # Comparisons depend only on the set of compared items and the metrics table, so
+        # they're cached per (metrics_version, frozenset of item identities); the table
+        # can't change behind the version, which add_metrics() bumps
+        self.metrics_version = 0
+        self.analysis_cache = QueryCache(max_entries=4096, ttl=None, key=None)
+
+    @property
+    def comparison_metrics(self) -> Mapping:
+        # {domain: {item name: {metric: value}}}, read-only at every level
+        return MappingProxyType(self._metrics)
+
+    def add_metrics(self, domain: str, rows: dict):
+        # Register (or extend) a domain; its matrix and the detection tables are rebuilt once
+        # per call. This is the only way to change metrics
+        self._set_rows(domain, rows)
+        self._build_detection()
+        self.metrics_version += 1
+        self.analysis_cache.clear()
+
+    def _set_rows(self, domain: str, rows: dict):
+        # Rows are copied, so later edits to the caller's dicts don't reach the registry
+        merged = dict(self._metrics.get(domain, {}))
+        merged.update((name, MappingProxyType(dict(fields))) for name, fields in rows.items())
+        self._metrics[domain] = MappingProxyType(merged)
+        self._engines[domain] = MetricMatrix(merged)
+
+    def _build_detection(self):
+        # Item name -> domain for exact names; a matcher finds names mentioned in free text
+        self._domain_of = {}
+        self._name_matcher = KeywordMatcher()
+        for domain, rows in self._metrics.items():
+            for name in rows:
+                self._domain_of.setdefault(name, domain)
+                self._name_matcher.add(name, domain, name)
+        self._name_matcher.build()
+
+    def compare(self, names, domain: str, weights: dict = None, k: int = None) -> dict:
+        """
+        Weighted comparison of the named items of a domain (every item when names is
+        None): (name, score) best first, optionally only the top k, and the table of
+        pairwise score differences between them, rows and columns in ranking order.
+        """
+        engine = self.engines[domain]
+        ranking = engine.top_k(k, weights, names) if k is not None else engine.rank(weights, names)
+        ranked, differences = engine.pairwise(weights=weights, names=[name for name, _ in ranking])
+        return {
+            "domain": domain,
+            "ranking": ranking,
+            "names": ranked,
+            "pairwise": differences.tolist(),
+        }
 
     def analyze(self, data) -> dict:
-        self.analysis_count += 1
+        self.analysis_count = analysis_id = next(self._analysis_ids)
         
         if not data:
-            return {
+            return AnalysisResult({
                 "status": "fail",
                 "summary": "No data available for analysis. Try a comparison query like 'Compare Adam vs SGD'",
                 "confidence": 0.3,
-                "analysis_id": self.analysis_count
-            }
-
-        summary_lines = []
-        comparison_data = {}
+                "analysis_id": analysis_id
+            })
 
-        # Detect and compare neural network types
-        nn_types = ["CNN", "RNN", "LSTM", "GRU", "Transformer", "DNN"]
-        matching_nn = [item for item in data if isinstance(item, dict) and item.get("name") in nn_types 
-                       or isinstance(item, str) and item in nn_types]
-        
-        if matching_nn or any(nn in str(data) for nn in nn_types):
-            summary_lines.append("[NEURAL NETWORK COMPARISON]\n")
-            comparison_data = self._compare_neural_networks(data)
-            summary_lines.append(self._format_comparison(comparison_data))
-
-        # Detect and compare optimization techniques
-        opt_types = ["Gradient Descent", "Adam", "RMSProp", "Adagrad", "Nadam"]
-        matching_opt = [item for item in data if isinstance(item, dict) and item.get("name") in opt_types 
-                        or isinstance(item, str) and item in opt_types]
-        
-        if matching_opt or any(opt in str(data) for opt in opt_types):
-            summary_lines.append("[OPTIMIZATION TECHNIQUE COMPARISON]\n")
-            comparison_data = self._compare_optimizers(data)
-            summary_lines.append(self._format_comparison(comparison_data))
-
-        # Generic summary if no specific matches
-        if not summary_lines:
-            summary_lines.append("[INFORMATION SUMMARY]\n")
-            if isinstance(data, list) and len(data) > 0:
-                summary_lines.append(f"Found {len(data)} items:\n")
-                for item in data:
-                    if isinstance(item, dict):
-                        name = item.get("name", "Item")
-                        summary_lines.append(f"\n{name}:")
-                        for key, value in item.items():
-                            if key != "name":
-                                summary_lines.append(f"  - {key.replace('_', ' ').title()}: {value}")
-                    else:
-                        summary_lines.append(f"- {item}")
-
-        summary = "\n".join(summary_lines)
-        return {
+        # Classify every item once, then compare each detected domain in registry order
+        key = (self.metrics_version, self._identities(data))
+        comparisons = self.analysis_cache.get(key)
+        if comparisons is None:
+            comparisons = [
+                {"domain": domain, "items": [compared_item(name, fields)
+                                             for name, fields in self._compare_domain(domain, names).items()]}
+                for domain, names in self._detect(key[1]).items()
+            ]
+            self.analysis_cache.put(key, comparisons)
+        result = AnalysisResult({
             "status": "success",
-            "summary": summary,
-            "confidence": 0.92 if comparison_data else 0.70,
-            "analysis_id": self.analysis_count,
+            "confidence": 0.92 if comparisons else 0.70,
+            "analysis_id": analysis_id,
             "items_analyzed": len(data) if isinstance(data, list) else 1,
-            "analysis_type": "comparative" if comparison_data else "descriptive"
-        }
+            "analysis_type": "comparative" if comparisons else "descriptive"
+        }, source=data)
+        if comparisons:
+            result["comparisons"] = copy_comparisons(comparisons)
+        elif isinstance(data, list):
+            result["names"] = item_names(data)
+        return result
 
-    def _compare_neural_networks(self, data) -> dict:
-        nn_to_compare = {}
-        metrics = self.comparison_metrics["neural_networks"]
-        
-        for item in data:
-            name = item.get("name") if isinstance(item, dict) else item
-            if name in metrics:
-                nn_to_compare[name] = metrics[name]
-        
-        return nn_to_compare if nn_to_compare else metrics
+    async def analyze_async(self, data) -> dict:
+        return await run_blocking(self.analyze, data)
 
-    def _compare_optimizers(self, data) -> dict:
-        opt_to_compare = {}
-        metrics = self.comparison_metrics["optimization"]
-        
-        for item in data:
-            name = item.get("name") if isinstance(item, dict) else item
-            if name in metrics:
-                opt_to_compare[name] = metrics[name]
-        
-        return opt_to_compare if opt_to_compare else metrics
+    def _identities(self, data) -> frozenset:
+        # All a comparison depends on: registered names of dict items, and string items
+        identities = set()
+        for item in data if isinstance(data, (list, tuple)) else [data]:
+            if isinstance(item, dict):
+                name = item.get("name")
+                if isinstance(name, str) and name in self._domain_of:
+                    identities.add(name)
+            elif isinstance(item, str):
+                identities.add(item)
+        return frozenset(identities)
 
-    def _format_comparison(self, comparison_data: dict) -> str:
-        if not comparison_data:
-            return ""
-        lines = []
-        for item_name, metrics in comparison_data.items():
-            lines.append(f"\n**{item_name}**")
-            if isinstance(metrics, dict):
-                for metric, value in metrics.items():
-                    if metric not in ["best_for", "use_cases"]:
-                        if isinstance(value, (int, float)):
-                            bar = "█" * value + "░" * (10 - value)
-                            lines.append(f"  {metric.capitalize()}: {bar} ({value}/10)")
-                    else:
-                        lines.append(f"  {metric.capitalize()}: {value}")
-        
-        return "\n".join(lines)
+    def _detect(self, identities) -> dict:
+        # {domain: item names} in one pass: registered names are looked up, other
+        # strings are scanned once for the registered names they mention
+        groups = {domain: [] for domain in self._metrics}
+        for identity in identities:
+            domain = self._domain_of.get(identity)
+            if domain is not None:
+                groups[domain].append(identity)
+            else:
+                for match in self._name_matcher.scan(identity):
+                    groups[match.label].append(match.value)
+        return {domain: names for domain, names in groups.items() if names}
+
+    def _compare_domain(self, domain: str, names) -> dict:
+        # Registry rows of the named items in registry order, or the whole domain if none are known
+        engine = self.engines[domain]
+        metrics = self._metrics[domain]
+        rows = np.sort(engine.rows_for(names))
+        if not len(rows):
+            return metrics
+        return {engine.names[i]: metrics[engine.names[i]] for i in rows}
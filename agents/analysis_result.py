@@ -0,0 +1,145 @@
+import json
+from typing import Any, Dict, List
+
+# Section headings per domain; other domains get "<DOMAIN> COMPARISON"
+DOMAIN_TITLES = {
+    "neural_networks": "NEURAL NETWORK COMPARISON",
+    "optimization": "OPTIMIZATION TECHNIQUE COMPARISON",
+}
+# Non-numeric registry fields worth showing next to the scores
+TEXT_FIELDS = ("best_for", "use_cases")
+FORMATS = ("text", "markdown", "json")
+
+
+def domain_title(domain: str) -> str:
+    return DOMAIN_TITLES.get(domain, domain.replace("_", " ").upper() + " COMPARISON")
+
+
+def compared_item(name: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    # Compact form of one compared item: numeric scores plus the displayed text fields
+    item = {"name": name, "scores": {metric: value for metric, value in fields.items()
+                                     if isinstance(value, (int, float)) and metric not in TEXT_FIELDS}}
+    notes = {metric: fields[metric] for metric in TEXT_FIELDS if metric in fields}
+    if notes:
+        item["notes"] = notes
+    return item
+
+
+def copy_comparisons(comparisons: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Fresh containers for one result, so editing it never reaches a cached comparison
+    return [dict(comparison, items=[dict(item, **{key: dict(item[key]) for key in ("scores", "notes") if key in item})
+                                    for item in comparison["items"]])
+            for comparison in comparisons]
+
+
+class AnalysisResult(dict):
+    """
+    Structured analysis output: status, confidence, ids and counts, plus either
+    "comparisons" ([{"domain", "items": [{"name", "scores", "notes"}]}]) or, for
+    descriptive results, the analyzed item "names".
+    - Nothing is rendered up front; text(), markdown() and to_json() render on first
+      call and memoize, so the stored and transmitted form stays compact
+    - result["summary"] still works and returns the text rendering
+    - Treat it as immutable once built; renderings are not invalidated
+    """
+
+    def __init__(self, *args, source=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The analyzed items, kept (not serialized) so descriptive text shows every field
+        self._source = source
+        self._rendered: Dict[str, str] = {}
+
+    @classmethod
+    def of(cls, result: Dict[str, Any]) -> "AnalysisResult":
+        # Wrap plain dicts, e.g. results read back from the memory store
+        return result if isinstance(result, cls) else cls(result)
+
+    def __missing__(self, key):
+        if key == "summary":
+            return self.text()
+        raise KeyError(key)
+
+    def __reduce__(self):
+        # Ship the compact form only; renderings are rebuilt where they are needed
+        return self.__class__, (dict(self),)
+
+    def render(self, fmt: str = "text") -> str:
+        rendered = self._rendered.get(fmt)
+        if rendered is None:
+            if fmt not in FORMATS:
+                raise ValueError(f"unknown format {fmt!r}; expected one of {FORMATS}")
+            rendered = self._rendered[fmt] = getattr(self, f"_render_{fmt}")()
+        return rendered
+
+    def text(self) -> str:
+        return self.render("text")
+
+    def markdown(self) -> str:
+        return self.render("markdown")
+
+    def to_json(self) -> str:
+        return self.render("json")
+
+    def _render_text(self) -> str:
+        if "summary" in self:
+            return dict.__getitem__(self, "summary")
+        lines = []
+        for comparison in self.get("comparisons", []):
+            lines.append(f"[{domain_title(comparison['domain'])}]\n")
+            lines.append("\n".join(_text_item(item) for item in comparison["items"]))
+        if not lines:
+            lines.append("[INFORMATION SUMMARY]\n")
+            items = self._source if self._source is not None else self.get("names")
+            if isinstance(items, list) and items:
+                lines.append(f"Found {len(items)} items:\n")
+                lines.extend(_text_entry(item) for item in items)
+        return "\n".join(lines)
+
+    def _render_markdown(self) -> str:
+        if "summary" in self:
+            return dict.__getitem__(self, "summary")
+        blocks = []
+        for comparison in self.get("comparisons", []):
+            items = comparison["items"]
+            metrics = list(dict.fromkeys(metric for item in items for metric in item["scores"]))
+            notes = list(dict.fromkeys(field for item in items for field in item.get("notes", {})))
+            columns = ["Item"] + [metric.replace("_", " ").title() for metric in metrics + notes]
+            rows = [[f"**{item['name']}**"] + [str(item["scores"].get(metric, "")) for metric in metrics]
+                    + [str(item.get("notes", {}).get(field, "")) for field in notes] for item in items]
+            blocks.append("\n".join([f"#### {domain_title(comparison['domain']).title()}", "",
+                                     "| " + " | ".join(columns) + " |",
+                                     "|" + "---|" * len(columns)]
+                                    + ["| " + " | ".join(row) + " |" for row in rows]))
+        if not blocks:
+            items = self._source if self._source is not None else self.get("names", [])
+            blocks.append("\n".join(f"- **{item.get('name', 'Item')}**" if isinstance(item, dict) else f"- {item}"
+                                    for item in items) if isinstance(items, list) else "")
+        return "\n\n".join(blocks)
+
+    def _render_json(self) -> str:
+        return json.dumps(self)
+
+
+def _bar(value) -> str:
+    filled = min(10, max(0, int(round(value))))
+    return "█" * filled + "░" * (10 - filled)
+
+
+def _text_item(item: Dict[str, Any]) -> str:
+    lines = [f"\n**{item['name']}**"]
+    lines.extend(f"  {metric.capitalize()}: {_bar(value)} ({value}/10)" for metric, value in item["scores"].items())
+    lines.extend(f"  {field.capitalize()}: {value}" for field, value in item.get("notes", {}).items())
+    return "\n".join(lines)
+
+
+def _text_entry(item) -> str:
+    if not isinstance(item, dict):
+        return f"- {item}"
+    lines = [f"\n{item.get('name', 'Item')}:"]
+    lines.extend(f"  - {key.replace('_', ' ').title()}: {value}" for key, value in item.items() if key != "name")
+    return "\n".join(lines)
+
+
+def item_names(data) -> List[Any]:
+    # Compact stand-ins for analyzed items: names for dicts, the item itself otherwise
+    return [item.get("name", "Item") if isinstance(item, dict) else item for item in data]
@@ -0,0 +1,15 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# One executor for all blocking agent work (SQLite, file I/O, CPU-bound scoring), shared
+# by every event loop so each loop doesn't spawn its own threads
+AGENT_EXECUTOR = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4),
+                                    thread_name_prefix="agent-worker")
+
+
+async def run_blocking(func: Callable[..., Any], *args) -> Any:
+    # Await a blocking call without stalling the event loop
+    return await asyncio.get_running_loop().run_in_executor(AGENT_EXECUTOR, func, *args)
+
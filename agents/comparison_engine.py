@@ -0,0 +1,114 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class MetricMatrix:
+    """
+    Numeric metrics of one domain as an items x metrics float matrix.
+    - name -> row and metric -> column indexes; missing values are NaN and count as 0
+      in scores
+    - Non-numeric fields (e.g. "best_for") stay in `notes`
+    - Scoring, ranking, top-k and pairwise differences are each a single NumPy
+      operation over the selected rows, so their Python overhead doesn't grow with
+      the number of items or metrics
+    """
+
+    def __init__(self, rows: Dict[str, Dict[str, Any]]):
+        self.names: List[str] = list(rows)
+        self.row = {name: i for i, name in enumerate(self.names)}
+        self.metrics: List[str] = []
+        self.notes: Dict[str, Dict[str, Any]] = {}
+        for name, fields in rows.items():
+            for metric, value in fields.items():
+                if _is_number(value):
+                    if metric not in self.metrics:
+                        self.metrics.append(metric)
+                else:
+                    self.notes.setdefault(name, {})[metric] = value
+        self.column = {metric: j for j, metric in enumerate(self.metrics)}
+        self.values = np.full((len(self.names), len(self.metrics)), np.nan)
+        for name, fields in rows.items():
+            for metric, value in fields.items():
+                if _is_number(value):
+                    self.values[self.row[name], self.column[metric]] = value
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self.row
+
+    def rows_for(self, names: Iterable[str] = None) -> np.ndarray:
+        # Row indexes of the known names, in first-seen order; None selects every row
+        if names is None:
+            return np.arange(len(self.names))
+        row = self.row
+        return np.fromiter(dict.fromkeys(row[name] for name in names if name in row), dtype=np.int64)
+
+    def weight_vector(self, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        # Metric weights as a column vector; None weighs every metric equally
+        if weights is None:
+            return np.ones(len(self.metrics))
+        unknown = set(weights) - set(self.column)
+        if unknown:
+            raise KeyError(f"unknown metrics: {sorted(unknown)}")
+        vector = np.zeros(len(self.metrics))
+        vector[[self.column[metric] for metric in weights]] = list(weights.values())
+        return vector
+
+    def scores(self, weights: Optional[Dict[str, float]] = None, rows: np.ndarray = None) -> np.ndarray:
+        # Weighted mean per row: (values @ w) / sum(|w|)
+        values = self.values if rows is None else self.values[rows]
+        vector = self.weight_vector(weights)
+        total = np.abs(vector).sum()
+        return np.nan_to_num(values) @ vector / (total if total else 1.0)
+
+    def rank(self, weights: Optional[Dict[str, float]] = None, names: Iterable[str] = None) -> List[Tuple[str, float]]:
+        # (name, score) best first; ties keep registry order
+        rows = self.rows_for(names)
+        scores = self.scores(weights, rows)
+        order = np.argsort(-scores, kind="stable")
+        return [(self.names[rows[i]], float(scores[i])) for i in order]
+
+    def top_k(self, k: int, weights: Optional[Dict[str, float]] = None,
+              names: Iterable[str] = None) -> List[Tuple[str, float]]:
+        rows = self.rows_for(names)
+        if k <= 0 or not len(rows):
+            return []
+        scores = self.scores(weights, rows)
+        if k < len(rows):
+            candidates = np.sort(np.argpartition(-scores, k - 1)[:k])
+        else:
+            candidates = np.arange(len(rows))
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.names[rows[i]], float(scores[i])) for i in order]
+
+    def pairwise(self, metric: str = None, weights: Optional[Dict[str, float]] = None,
+                 names: Iterable[str] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        (names, table) where table[i, j] = value[i] - value[j] for one metric, or for
+        the weighted score when no metric is given.
+        """
+        rows = self.rows_for(names)
+        if metric is not None:
+            values = self.values[rows, self.column[metric]]
+        else:
+            values = self.scores(weights, rows)
+        return [self.names[i] for i in rows], values[:, None] - values[None, :]
+
+    def record(self, name: str) -> Dict[str, Any]:
+        # The row as a {metric: value} dict, notes included
+        values = self.values[self.row[name]]
+        record = {metric: _plain(values[j]) for j, metric in enumerate(self.metrics) if not np.isnan(values[j])}
+        record.update(self.notes.get(name, {}))
+        return record
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def _plain(value: float):
+    # Whole numbers come back as ints, as they were registered
+    return int(value) if float(value).is_integer() else float(value)
@@ -1,16 +1,42 @@
 from agents.research_agent import ResearchAgent
 from agents.analysis_agent import AnalysisAgent
 from agents.memory_agent import MemoryAgent
+from agents.keyword_matcher import KeywordMatch, KeywordMatcher
+from agents.query_cache import QueryCache, normalize_query
+from agents.async_support import run_blocking
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
+import multiprocessing
 import re
+import time
 from typing import Dict, List, Tuple
 
+# Opt-in memory settings for long-running services (the agent pool behind the app and
+# server, the benchmark): write-behind keeps the trailing store off the response path and
+# compaction bounds its size. A plain Coordinator() keeps every memory, as before
+MEMORY_OPTIONS = {"write_mode": "behind", "max_records": 50000,
+                  "dedupe_threshold": 0.995, "compact_interval": 600}
+# Research pulls at most this many items (most relevant first) into analysis and memory
+RESEARCH_LIMIT = 20
+
 
 class Coordinator:
-    def __init__(self):
-        self.research_agent = ResearchAgent()
-        self.analysis_agent = AnalysisAgent()
-        self.memory_agent = MemoryAgent()
+    def __init__(self, research_agent: ResearchAgent = None, analysis_agent: AnalysisAgent = None,
+                 memory_agent: MemoryAgent = None, research_limit: int = RESEARCH_LIMIT):
+        # Agents can be passed in to share one set between coordinators
+        self.research_agent = research_agent or ResearchAgent()
+        self.research_limit = research_limit
+        self.analysis_agent = analysis_agent or AnalysisAgent()
+        self.memory_agent = memory_agent or MemoryAgent()
+        # Repeated queries skip the memory scan and the pipeline entirely
+        self.query_cache = QueryCache(max_entries=1024, ttl=300.0)
+        self.memory_agent.add_clear_listener(self.query_cache.clear)
         self.query_history = []
+        self._background = set()
+        self._init_planner()
+
+    def _init_planner(self):
         # Common words to filter
         self.stop_words = set([
             "research", "analyze", "compare", "find", "what", "did", "we", "about",
@@ -38,45 +64,199 @@ class Coordinator:
             "optimization": 0.9, "algorithm": 0.7
         }
 
-    def handle_query(self, query: str) -> Dict:
-        self.query_history.append(query)
+        # Phrases that refer back to earlier conversation
+        self.context_keywords = ["earlier", "before", "previously", "we", "we discussed", "we talked",
+                                 "what did", "remember", "previous"]
+        # Comparison keywords indicate a multi-topic query
+        self.comparison_keywords = ["compare", "vs", "versus", "difference", "vs."]
+        self.technical_terms = [
+            "adam", "sgd", "gradient", "optimizer", "cnn", "rnn", "lstm", "transformer",
+            "neural", "network", "reinforcement", "learning", "deep", "bert", "gpt",
+            "classification", "regression", "clustering", "optimization", "algorithm"
+        ]
+
+        # Every vocabulary above in one automaton: a single pass over the query feeds
+        # context detection, planner scores and topic candidates
+        self.keyword_matcher = KeywordMatcher({
+            "context": self.context_keywords,
+            "research": self.research_keywords,
+            "analysis": self.analysis_keywords,
+            "comparison": self.comparison_keywords,
+            "technical": self.technical_terms,
+        })
+        self.keyword_matcher.build()
+        self._scan = lru_cache(maxsize=1024)(self._scan_query)
+
+    def _scan_query(self, query: str) -> Dict[str, List[KeywordMatch]]:
+        # Matches grouped by vocabulary, memoized so each query is scanned once
+        found = {}
+        for match in self.keyword_matcher.scan(query):
+            found.setdefault(match.label, []).append(match)
+        return found
+
+    def handle_query(self, query: str, session=None) -> Dict:
+        # The async pipeline's steps run inline on the calling thread, so no event loop
+        # is built per query. The result is stored before it is returned, so later lookups
+        # see it; with write_mode="behind" that store is only buffered until the next
+        # flush, so callers that need it on disk call memory_agent.flush()
+        history = self._record_query(query, session)
+        if self._uses_context(query, history):
+            previous_topics = list(history)[:-1]
+            result = self._context_result(previous_topics, self.memory_agent.retrieve_many(previous_topics))
+            if result is not None:
+                return result
+
+        cached = self.query_cache.get(query)
+        if cached is not None:
+            return cached
+
+        memory_response, confidence = self._retrieve_from_memory_advanced(query)
+        if memory_response and confidence > 0.85:
+            return self._cache_result(query, self._memory_result(memory_response, confidence))
+
+        steps, step_confidence = self.plan_tasks_advanced(query)
+        final_result, execution_trace = self._execute_steps(query, steps or ["research"])
+        self.memory_agent.store(query, final_result)
+        return self._cache_result(query, self._execution_result(final_result, step_confidence, execution_trace))
+
+    async def handle_query_async(self, query: str, session=None, wait_for_store: bool = False) -> Dict:
+        history = self._record_query(query, session)
         
         #if query references earlier conversation
-        context_keywords = ["earlier", "before", "previously", "we", "we discussed", "we talked", "what did", "remember", "previous"]
-        uses_context = any(keyword in query.lower() for keyword in context_keywords)
-        
-        if uses_context and len(self.query_history) > 1:
-            previous_results = []
-            for prev_query in self.query_history[:-1]:  
-                prev_result = self.memory_agent.retrieve(prev_query)
-                if prev_result:
-                    previous_results.append(prev_result)
-            
-            if previous_results:
-                return {
-                    "from_memory": True,
-                    "response": {
-                        "context": "Based on our earlier conversations",
-                        "previous_topics": self.query_history[:-1],
-                        "summary": previous_results
-                    },
-                    "confidence": 0.75,
-                    "source": "context"
-                }
+        if self._uses_context(query, history):
+            previous_topics = list(history)[:-1]
+            result = self._context_result(previous_topics,
+                                          await self.memory_agent.retrieve_many_async(previous_topics))
+            if result is not None:
+                return result
         
-        memory_response, confidence = self._retrieve_from_memory_advanced(query)
+        cached = self.query_cache.get(query)
+        if cached is not None:
+            return cached
+
+        # Research starts only after the memory probe misses: work already handed to the
+        # executor can't be cancelled, so a hit must not leave any behind
+        memory_response, confidence = await self._retrieve_from_memory_advanced_async(query)
         if memory_response and confidence > 0.85:
-            return {
-                "from_memory": True,
-                "response": memory_response,
-                "confidence": confidence,
-                "source": "memory"
-            }
+            return self._cache_result(query, self._memory_result(memory_response, confidence))
 
         steps, step_confidence = self.plan_tasks_advanced(query)
-        if not steps:
-            steps = ["research"] 
+        final_result, execution_trace = await run_blocking(self._execute_steps, query, steps or ["research"])
+
+        # The store overlaps with returning the response unless the caller waits for it
+        # (waiting covers the hand-off; write-behind still commits on its next flush)
+        store = self.memory_agent.store_async(query, final_result)
+        if wait_for_store:
+            await store
+        else:
+            self._track_background(asyncio.ensure_future(store))
         
+        return self._cache_result(query, self._execution_result(final_result, step_confidence, execution_trace))
+
+    def _record_query(self, query: str, session=None):
+        # With a session, context comes from its own bounded history instead of query_history
+        history = session.history if session is not None else self.query_history
+        history.append(query)
+        return history
+
+    def _uses_context(self, query: str, history) -> bool:
+        return "context" in self._scan(query) and len(history) > 1
+
+    def _context_result(self, previous_topics: List[str], recalled: List) -> Dict:
+        # None when nothing earlier is in memory; the query then runs as usual
+        previous_results = [prev_result for prev_result in recalled if prev_result]
+        if not previous_results:
+            return None
+        return {
+            "from_memory": True,
+            "response": {
+                "context": "Based on our earlier conversations",
+                "previous_topics": previous_topics,
+                "summary": previous_results
+            },
+            "confidence": 0.75,
+            "source": "context"
+        }
+
+    def _cache_result(self, query: str, result: Dict) -> Dict:
+        self.query_cache.put(query, result)
+        return result
+
+    def handle_queries(self, queries: List[str], workers: int = 4, processes: bool = False) -> List[Dict]:
+        """
+        Answer a batch of queries (evaluation sets, cache warming) in input order.
+        Queries are de-duplicated on their normalized form, probed against the cache
+        and then memory in one batched lookup; misses run on a pool of `workers`
+        threads (or processes, which scale the CPU-bound pipeline across cores) and
+        their results are written with one bulk store. Each result carries its own
+        "elapsed_ms" and whether it was served as a "duplicate" of an earlier query.
+        Batch queries don't enter the conversation history.
+        """
+        unique = {}
+        for query in queries:
+            unique.setdefault(normalize_query(query), query)
+        results, elapsed = {}, {}
+
+        for key, query in unique.items():
+            start = time.perf_counter()
+            cached = self.query_cache.get(query)
+            if cached is not None:
+                results[key] = cached
+                elapsed[key] = time.perf_counter() - start
+
+        pending = [key for key in unique if key not in results]
+        if pending:
+            start = time.perf_counter()
+            memory_responses = self.memory_agent.retrieve_many([unique[key] for key in pending])
+            lookup = (time.perf_counter() - start) / len(pending)
+            misses = []
+            for key, memory_response in zip(pending, memory_responses):
+                memory_response, confidence = self._score_memory_response(memory_response)
+                if memory_response and confidence > 0.85:
+                    results[key] = self._memory_result(memory_response, confidence)
+                else:
+                    misses.append(key)
+                elapsed[key] = lookup
+            self._execute_batch(unique, misses, results, elapsed, workers, processes)
+
+        output = []
+        seen = set()
+        for query in queries:
+            key = normalize_query(query)
+            result = dict(results[key], elapsed_ms=1000 * elapsed[key], duplicate=key in seen)
+            seen.add(key)
+            output.append(result)
+        return output
+
+    def _execute_batch(self, unique, misses, results, elapsed, workers: int, processes: bool):
+        # Run cache/memory misses on a pool, then store all new results at once
+        if not misses:
+            return
+        if processes:
+            # Spawned, not forked: a fork copies locks held by the flusher, compactor or
+            # executor threads (e.g. the shared knowledge base lock) and can deadlock the child
+            executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_init_pipeline_worker, initargs=(self.research_limit,))
+            run = _run_pipeline_in_worker
+        else:
+            executor = ThreadPoolExecutor(workers)
+            run = self._run_pipeline
+        chunksize = max(1, len(misses) // (4 * workers))
+        with executor:
+            outcomes = list(executor.map(run, [unique[key] for key in misses], chunksize=chunksize))
+        for key, (final_result, step_confidence, execution_trace, seconds) in zip(misses, outcomes):
+            results[key] = self._execution_result(final_result, step_confidence, execution_trace)
+            elapsed[key] += seconds
+            self.query_cache.put(unique[key], results[key])
+        self.memory_agent.store_many([(unique[key], results[key]["response"]) for key in misses])
+
+    def _run_pipeline(self, query: str):
+        start = time.perf_counter()
+        steps, step_confidence = self.plan_tasks_advanced(query)
+        final_result, execution_trace = self._execute_steps(query, steps or ["research"])
+        return final_result, step_confidence, execution_trace, time.perf_counter() - start
+
+    def _execute_steps(self, query: str, steps: List[str]) -> Tuple[Dict, List[str]]:
         final_result = {}
         last_output = None
         execution_trace = []
@@ -84,7 +264,7 @@ class Coordinator:
         for step in steps:
             if step == "research":
                 topic = self._extract_topic_advanced(query, last_output)
-                research_result = self.research_agent.research(topic)
+                research_result = self._research(topic)
                 final_result["research"] = research_result
                 last_output = research_result.get("result", [])
                 execution_trace.append(f"Research on '{topic}' completed")
@@ -94,31 +274,49 @@ class Coordinator:
                 final_result["analysis"] = analysis_result
                 execution_trace.append("Analysis completed")
 
-        self.memory_agent.store(query, final_result)
-        
+        return final_result, execution_trace
+
+    def _research(self, topic: str) -> Dict:
+        # Only the top research_limit items are loaded; items_found still counts every match
+        return self.research_agent.research_iter(topic, limit=self.research_limit).to_result()
+
+    def _memory_result(self, memory_response, confidence: float) -> Dict:
+        return {
+            "from_memory": True,
+            "response": memory_response,
+            "confidence": confidence,
+            "source": "memory"
+        }
+
+    def _execution_result(self, final_result: Dict, confidence: float, execution_trace: List[str]) -> Dict:
         return {
             "from_memory": False,
             "response": final_result,
-            "confidence": step_confidence,
+            "confidence": confidence,
             "execution_trace": execution_trace,
             "source": "execution"
         }
 
+    def _track_background(self, task):
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def drain(self):
+        # Wait for trailing stores started by handle_query_async
+        if self._background:
+            await asyncio.gather(*list(self._background), return_exceptions=True)
+
     def plan_tasks_advanced(self, query: str) -> Tuple[List[str], float]:
       
         steps = []
-        scores = {"research": 0.0, "analysis": 0.0}
-        q = query.lower()
+        found = self._scan(query)
         
-        # Score research relevance
-        for keyword, score in self.research_keywords.items():
-            if keyword in q:
-                scores["research"] += score
-        
-        # Score analysis relevance
-        for keyword, score in self.analysis_keywords.items():
-            if keyword in q:
-                scores["analysis"] += score
+        # Score research and analysis relevance; each keyword counts once
+        scores = {
+            label: sum({match.term: match.value for match in found.get(label, [])}.values())
+            for label in ("research", "analysis")
+        }
         
         # Calculate confidence based on what we're doing
         if scores["analysis"] > 0.5:  
@@ -138,8 +336,13 @@ class Coordinator:
         
         return steps, min(confidence, 1.0)
 
+    async def _retrieve_from_memory_advanced_async(self, query: str) -> Tuple[Dict, float]:
+        return await run_blocking(self._retrieve_from_memory_advanced, query)
+
     def _retrieve_from_memory_advanced(self, query: str) -> Tuple[Dict, float]:
-        memory_response = self.memory_agent.retrieve(query)
+        return self._score_memory_response(self.memory_agent.retrieve(query))
+
+    def _score_memory_response(self, memory_response) -> Tuple[Dict, float]:
         if memory_response:
             confidence = 0.85  
             return memory_response, confidence
@@ -149,24 +352,11 @@ class Coordinator:
         if last_output:
             return last_output[0] if last_output else "general"
        
-        cleaned = re.sub(r'[?!.,;:\'"()]', '', query.lower())
-        words = cleaned.split()
+        found = self._scan(query)
+        is_comparison = "comparison" in found
         
-        technical_terms = [
-            "adam", "sgd", "gradient", "optimizer", "cnn", "rnn", "lstm", "transformer",
-            "neural", "network", "reinforcement", "learning", "deep", "bert", "gpt",
-            "classification", "regression", "clustering", "optimization", "algorithm"
-        ]
-        
-        # Check for comparison keywords (indicates multi-topic query)
-        comparison_keywords = ["compare", "vs", "versus", "difference", "vs."]
-        is_comparison = any(kw in query.lower() for kw in comparison_keywords)
-        
-        # Extract ALL technical terms for comparison queries
-        found_topics = []
-        for word in words:
-            if word in technical_terms:
-                found_topics.append(word)
+        # Extract ALL technical terms (whole words, in query order) for comparison queries
+        found_topics = [match.term for match in found.get("technical", []) if match.exact]
         
         # For comparisons, return all topics joined; for single queries, return first topic
         if is_comparison and len(found_topics) >= 2:
@@ -175,6 +365,7 @@ class Coordinator:
             return found_topics[0]
         
         # Filter common stop words for fallback
+        words = re.sub(r'[?!.,;:\'"()]', '', query.lower()).split()
         topic_words = [w for w in words if w not in self.stop_words and len(w) > 2]
         
         if topic_words:
@@ -182,3 +373,25 @@ class Coordinator:
             return max(topic_words, key=len)
         
         return "general"
+
+
+class _PipelineWorker(Coordinator):
+    """Planning, research and analysis only; memory stays with the parent process."""
+
+    def __init__(self, research_limit: int = RESEARCH_LIMIT):
+        self.research_agent = ResearchAgent()
+        self.research_limit = research_limit
+        self.analysis_agent = AnalysisAgent()
+        self._init_planner()
+
+
+_WORKER = None
+
+
+def _init_pipeline_worker(research_limit: int = RESEARCH_LIMIT):
+    global _WORKER
+    _WORKER = _PipelineWorker(research_limit)
+
+
+def _run_pipeline_in_worker(query: str):
+    return _WORKER._run_pipeline(query)
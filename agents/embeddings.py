@@ -0,0 +1,124 @@
+from functools import lru_cache
+from typing import List, Union
+
+import numpy as np
+import scipy.sparse as sp
+
+EMBEDDING_DIM = 26
+
+
+def _letter_codes(text: str) -> np.ndarray:
+    # Lowercased UTF-8 bytes shifted so 'a'..'z' map to 0..25; multi-byte chars fall outside
+    return np.frombuffer(text.lower().encode("utf-8"), dtype=np.uint8) - np.uint8(ord("a"))
+
+
+@lru_cache(maxsize=4096)
+def _embed_cached(text: str) -> np.ndarray:
+    codes = _letter_codes(text)
+    vec = np.bincount(codes[codes < EMBEDDING_DIM], minlength=EMBEDDING_DIM).astype(np.float64)
+    vec.flags.writeable = False
+    return vec
+
+
+def embed(text):
+    # Letter-frequency vector; repeated topics are served from a small LRU cache
+    return _embed_cached(text).copy()
+
+
+def embed_batch(texts: List[str]) -> np.ndarray:
+    # Embed many texts at once into a (len(texts), 26) array with a single bincount
+    if not texts:
+        return np.zeros((0, EMBEDDING_DIM))
+    encoded = [_letter_codes(text) for text in texts]
+    codes = np.concatenate(encoded)
+    rows = np.repeat(np.arange(len(texts)), [len(c) for c in encoded])
+    letters = codes < EMBEDDING_DIM
+    flat = rows[letters] * EMBEDDING_DIM + codes[letters]
+    counts = np.bincount(flat, minlength=len(texts) * EMBEDDING_DIM)
+    return counts.reshape(len(texts), EMBEDDING_DIM).astype(np.float64)
+
+
+class CharFrequencyBackend:
+    """
+    26-dim letter-frequency embedding (the original scheme).
+    Its vectors live in the memories.vector column, so every store has them.
+    """
+
+    name = "charfreq"
+    dim = EMBEDDING_DIM
+    sparse = False
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        return embed_batch(texts)
+
+    def encode(self, vectors: np.ndarray) -> List[bytes]:
+        return [row.tobytes() for row in np.asarray(vectors, dtype=np.float32)]
+
+    def decode(self, blobs: List[bytes]) -> np.ndarray:
+        flat = np.frombuffer(b"".join(blobs), dtype=np.float32)
+        return flat.reshape(len(blobs), self.dim)
+
+
+class HashedNgramBackend:
+    """
+    Sparse hashed n-gram embedding built on scikit-learn's HashingVectorizer.
+    - Character 3-5 grams (within word boundaries) plus word unigrams and bigrams
+    - Rows are L2-normalized CSR vectors, so a sparse dot product is the cosine
+    - Anagram-like topics no longer collide, unlike letter counts
+    """
+
+    name = "hashed_ngram"
+    sparse = True
+
+    def __init__(self, n_features: int = 2 ** 18):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.dim = 2 * n_features
+        self._char = HashingVectorizer(analyzer="char_wb", ngram_range=(3, 5),
+                                       n_features=n_features, alternate_sign=False, norm="l2")
+        self._word = HashingVectorizer(analyzer="word", ngram_range=(1, 2),
+                                       n_features=n_features, alternate_sign=False, norm="l2")
+
+    def embed_batch(self, texts: List[str]) -> sp.csr_matrix:
+        from sklearn.preprocessing import normalize
+
+        stacked = sp.hstack([self._char.transform(texts), self._word.transform(texts)])
+        return normalize(stacked.tocsr().astype(np.float32))
+
+    def encode(self, vectors: sp.csr_matrix) -> List[bytes]:
+        # int32 column indices followed by float32 values for each row
+        blobs = []
+        for i in range(vectors.shape[0]):
+            start, end = vectors.indptr[i], vectors.indptr[i + 1]
+            blobs.append(vectors.indices[start:end].astype(np.int32).tobytes()
+                         + vectors.data[start:end].astype(np.float32).tobytes())
+        return blobs
+
+    def decode(self, blobs: List[bytes]) -> sp.csr_matrix:
+        nnz = np.array([len(blob) // 8 for blob in blobs], dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(nnz)])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        data = np.empty(indptr[-1], dtype=np.float32)
+        for i, blob in enumerate(blobs):
+            raw = np.frombuffer(blob, dtype=np.uint8)
+            split = nnz[i] * 4
+            indices[indptr[i]:indptr[i + 1]] = raw[:split].view(np.int32)
+            data[indptr[i]:indptr[i + 1]] = raw[split:].view(np.float32)
+        return sp.csr_matrix((data, indices, indptr), shape=(len(blobs), self.dim))
+
+
+EMBEDDING_BACKENDS = {
+    CharFrequencyBackend.name: CharFrequencyBackend,
+    HashedNgramBackend.name: HashedNgramBackend,
+}
+
+EmbeddingBackend = Union[CharFrequencyBackend, HashedNgramBackend]
+
+
+def get_backend(backend) -> EmbeddingBackend:
+    # Accept a registered backend name or an already-built backend object
+    if isinstance(backend, str):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        return EMBEDDING_BACKENDS[backend]()
+    return backend
@@ -0,0 +1,118 @@
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple, Union
+
+# Endings a match may carry past its term and still count as the same word
+# ("networks", "learning"); anything else glued on means it's part of another word
+INFLECTIONS = ("s", "es", "ed", "ing")
+
+
+class KeywordMatch(NamedTuple):
+    term: str
+    label: str
+    value: Any
+    start: int
+    end: int
+    exact: bool  # False when the word continues with one of INFLECTIONS
+
+
+def _is_word_char(ch: str) -> bool:
+    # Hyphenated words are one word: "learning" is not a match inside "q-learning"
+    return ch.isalnum() or ch == "-"
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over labelled vocabularies (e.g. "research", "analysis").
+    - One left-to-right pass over the text finds every occurrence of every term,
+      independent of vocabulary size; building is linear in the total term length
+    - Matches must start at a word boundary and end at one, optionally after an
+      inflection ending, so "we" no longer matches inside "between" or "answer"
+    - The same term may appear under several labels
+    """
+
+    def __init__(self, vocabularies: Dict[str, Union[Iterable[str], Dict[str, Any]]] = None):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._terms: List[Tuple[str, str, Any]] = []
+        self._built = False
+        for label, terms in (vocabularies or {}).items():
+            self.add_all(label, terms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add(self, term: str, label: str, value: Any = None):
+        term = term.lower()
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self._terms))
+        self._terms.append((term, label, value))
+        self._built = False
+
+    def add_all(self, label: str, terms: Union[Iterable[str], Dict[str, Any]]):
+        # A dict maps each term to its value; any other iterable gets value None
+        items = terms.items() if isinstance(terms, dict) else ((term, None) for term in terms)
+        for term, value in items:
+            self.add(term, label, value)
+
+    def build(self):
+        # Breadth-first failure links; outputs of the failure target are merged in
+        queue = deque()
+        for node in self._goto[0].values():
+            self._fail[node] = 0
+            queue.append(node)
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+        self._built = True
+
+    def scan(self, text: str) -> List[KeywordMatch]:
+        # Every word-bounded match in text, ordered by start position
+        if not self._built:
+            self.build()
+        text = text.lower()
+        goto, fail, out, terms = self._goto, self._fail, self._out, self._terms
+        matches = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for term_id in out[node]:
+                term, label, value = terms[term_id]
+                start = i + 1 - len(term)
+                if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(term[0]):
+                    continue
+                exact = self._ends_word(text, i + 1, term)
+                if exact is None:
+                    continue
+                matches.append(KeywordMatch(term, label, value, start, i + 1, exact))
+        matches.sort(key=lambda match: (match.start, -len(match.term)))
+        return matches
+
+    @staticmethod
+    def _ends_word(text: str, end: int, term: str):
+        # True at a word boundary, False after an inflection ending, None inside a word
+        if end == len(text) or not _is_word_char(text[end]) or not _is_word_char(term[-1]):
+            return True
+        for suffix in INFLECTIONS:
+            after = end + len(suffix)
+            if text.startswith(suffix, end) and (after == len(text) or not _is_word_char(text[after])):
+                return False
+        return None
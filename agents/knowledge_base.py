@@ -0,0 +1,307 @@
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Tuple
+
+from agents.knowledge_index import index_item
+
+DEFAULT_KB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "knowledge_base.jsonl")
+SNAPSHOT_SUFFIX = ".snapshot"
+# Snapshot layout: magic, header length (8 bytes), JSON header, then one JSON blob per
+# category; the header holds each blob's (offset, length) and the name postings. Plain
+# data only: a snapshot is read back without running any code, whoever wrote the file
+_MAGIC = b"KRRKB2\n"
+_LENGTH = struct.Struct("<Q")
+
+
+def read_jsonl(path: str) -> Dict[str, Dict[str, Any]]:
+    # A line with "items" declares a category and its extra fields (e.g. "description");
+    # any other line is one item, filed under its "category"
+    categories: Dict[str, Dict[str, Any]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            try:
+                category = record.pop("category")
+            except KeyError:
+                raise ValueError(f"{path}:{line_number}: missing 'category'") from None
+            content = categories.setdefault(category, {"items": []})
+            if "items" in record:
+                content["items"].extend(record.pop("items"))
+                content.update(record)
+            else:
+                content["items"].append(record)
+    return categories
+
+
+def read_json(path: str) -> Dict[str, Dict[str, Any]]:
+    # One object of {category: {"items": [...], "description": ...}}, the in-code layout
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected an object of categories")
+    categories: Dict[str, Dict[str, Any]] = {}
+    for category, content in data.items():
+        if not isinstance(content, dict) or not isinstance(content.get("items", []), list):
+            raise ValueError(f"{path}: category {category!r} needs an 'items' list")
+        categories[category] = dict(content, items=list(content.get("items", [])))
+    return categories
+
+
+def read_parquet(path: str) -> Dict[str, Dict[str, Any]]:
+    # Same shape as JSONL: rows without a "name" declare a category, the rest are items.
+    # Needs a Parquet engine (pyarrow or fastparquet) next to pandas
+    import pandas as pd
+
+    categories: Dict[str, Dict[str, Any]] = {}
+    for record in pd.read_parquet(path).to_dict("records"):
+        record = {key: _plain(value) for key, value in record.items() if not _missing(value)}
+        category = record.pop("category")
+        content = categories.setdefault(category, {"items": []})
+        if "name" in record:
+            content["items"].append(record)
+        else:
+            content.update(record)
+    return categories
+
+
+def _missing(value) -> bool:
+    # Columns absent from a row come back as None/NaN
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _plain(value):
+    # List columns come back as numpy arrays
+    return value.tolist() if hasattr(value, "tolist") and not isinstance(value, (str, bytes)) else value
+
+
+READERS = {".jsonl": read_jsonl, ".json": read_json, ".parquet": read_parquet}
+
+
+def _source_stamp(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def compile_snapshot(categories: Dict[str, Dict[str, Any]], stamp: Tuple[int, int]) -> bytes:
+    blobs = []
+    entries = []
+    postings: Dict[str, Dict[str, List[int]]] = {}
+    offset = 0
+    for name, content in categories.items():
+        items = content.get("items", [])
+        for position, item in enumerate(items):
+            if isinstance(item, dict):
+                index_item(postings, name, position, item.get("name", ""))
+        blob = _dump_json(content)
+        entries.append((name, offset, len(blob), len(items)))
+        blobs.append(blob)
+        offset += len(blob)
+    header = _dump_json({"source": list(stamp), "categories": entries, "postings": postings})
+    return b"".join([_MAGIC, _LENGTH.pack(len(header)), header] + blobs)
+
+
+def _dump_json(obj) -> bytes:
+    # Numpy values from Parquet sources are stored as their plain equivalents
+    return json.dumps(obj, separators=(",", ":"), default=_plain).encode("utf-8")
+
+
+def _deep_size(obj, seen=None) -> int:
+    # Approximate resident bytes of a nested structure of builtins
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (dict, MappingProxyType)):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(v, seen) for v in obj)
+    return size
+
+
+class FrozenDict(dict):
+    # A dict that refuses changes: items are shared by every agent in the process, yet
+    # still pass isinstance(..., dict) checks and serialize as plain JSON objects
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("knowledge base items are read-only; copy with dict(item) to modify")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        # Pickle (process pools) and deepcopy rebuild from a plain dict, not item by item
+        return FrozenDict, (dict(self),)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((key, _freeze(v)) for key, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class KnowledgeBase(Mapping):
+    """
+    Read-only {category: {"items": (...), "description": ...}} loaded from a JSONL, JSON
+    or Parquet file.
+    - The first load compiles a binary snapshot next to the source; later loads only
+      read its header (category offsets and item-name postings), so startup skips parsing
+    - Categories are decoded on first access and cached; iteration, len() and
+      `in` never materialize anything
+    - Contents are read-only views with items as tuples of FrozenDicts (nested lists
+      become tuples), safe to share across threads and agents
+    """
+
+    def __init__(self, path: str = DEFAULT_KB_PATH, snapshot: bool = True):
+        self.path = path
+        self.snapshot_path = path + SNAPSHOT_SUFFIX if snapshot else None
+        self._file_lock = threading.Lock()
+        self._cache: Dict[str, Mapping] = {}
+        self._load_ms: Dict[str, float] = {}
+        start = time.perf_counter()
+        self.from_snapshot = self._open_snapshot()
+        if not self.from_snapshot:
+            self._compile()
+        self.load_ms = (time.perf_counter() - start) * 1000
+
+    def _open_snapshot(self) -> bool:
+        if not self.snapshot_path:
+            return False
+        try:
+            f = open(self.snapshot_path, "rb")
+        except OSError:
+            return False
+        try:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("not a knowledge base snapshot")
+            (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+            header = json.loads(f.read(length))
+            if tuple(header["source"]) != _source_stamp(self.path):
+                raise ValueError("stale snapshot")
+        except (ValueError, KeyError, TypeError, struct.error):
+            f.close()
+            return False
+        # The handle stays open: a snapshot replaced by a newer compile doesn't move our offsets
+        self._file = f
+        self._blob = None
+        self._use_header(header, len(_MAGIC) + _LENGTH.size + length)
+        return True
+
+    def _compile(self):
+        reader = READERS.get(os.path.splitext(self.path)[1].lower())
+        if reader is None:
+            raise ValueError(f"unsupported knowledge base format: {self.path}")
+        data = compile_snapshot(reader(self.path), _source_stamp(self.path))
+        written = False
+        if self.snapshot_path:
+            try:
+                # Write-then-rename so concurrent loaders never read a partial snapshot
+                temp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+                with open(temp, "wb") as f:
+                    f.write(data)
+                os.replace(temp, self.snapshot_path)
+                written = True
+            except OSError:
+                pass  # read-only location: serve from the in-memory copy
+        if written and self._open_snapshot():
+            return  # categories are read back from the file; the parsed copy is dropped
+        self._file = None
+        self._blob = data
+        (length,) = _LENGTH.unpack_from(data, len(_MAGIC))
+        start = len(_MAGIC) + _LENGTH.size
+        self._use_header(json.loads(data[start:start + length]), start + length)
+
+    def _use_header(self, header: Dict[str, Any], data_start: int):
+        self._entries = {name: (data_start + offset, length, count)
+                         for name, offset, length, count in header["categories"]}
+        # Per-category locks, so concurrent lookups load different categories in parallel
+        self._locks = {name: threading.Lock() for name in self._entries}
+        self._postings = header["postings"]
+
+    def _read_blob(self, offset: int, length: int) -> bytes:
+        if self._blob is not None:
+            return self._blob[offset:offset + length]
+        if hasattr(os, "pread"):
+            return os.pread(self._file.fileno(), length, offset)
+        with self._file_lock:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    def __getitem__(self, category: str) -> Mapping:
+        content = self._cache.get(category)
+        if content is not None:
+            return content
+        offset, length, _ = self._entries[category]
+        with self._locks[category]:
+            content = self._cache.get(category)
+            if content is None:
+                start = time.perf_counter()
+                raw = json.loads(self._read_blob(offset, length))
+                raw["items"] = _freeze(raw.get("items", []))
+                content = MappingProxyType(raw)
+                self._load_ms[category] = (time.perf_counter() - start) * 1000
+                self._cache[category] = content
+        return content
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, category) -> bool:
+        return category in self._entries
+
+    def materialized(self, category: str) -> bool:
+        # Whether category is already decoded, i.e. reading it costs no I/O
+        return category in self._cache
+
+    def item_count(self, category: str) -> int:
+        return self._entries[category][2]
+
+    def name_postings(self) -> Dict[str, Dict[str, List[int]]]:
+        # Prebuilt item-name postings for KnowledgeIndex, so indexing loads no category
+        return self._postings
+
+    def report(self) -> Dict[str, Any]:
+        categories = {}
+        for name, (_, length, count) in self._entries.items():
+            content = self._cache.get(name)
+            categories[name] = {
+                "items": count,
+                "snapshot_bytes": length,
+                "materialized": content is not None,
+                "load_ms": round(self._load_ms.get(name, 0.0), 3),
+                "resident_bytes": _deep_size(content) if content is not None else 0,
+            }
+        return {
+            "source": self.path,
+            "from_snapshot": self.from_snapshot,
+            "load_ms": round(self.load_ms, 3),
+            "categories": categories,
+        }
+
+
+_SHARED: Dict[str, Tuple[Tuple[int, int], KnowledgeBase]] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def load_knowledge_base(path: str = DEFAULT_KB_PATH) -> KnowledgeBase:
+    # One KnowledgeBase per source file in the process, reloaded only when the file changes
+    path = os.path.abspath(path)
+    stamp = _source_stamp(path)
+    with _SHARED_LOCK:
+        cached = _SHARED.get(path)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, KnowledgeBase(path))
+            _SHARED[path] = cached
+        return cached[1]
@@ -0,0 +1,101 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents.keyword_matcher import INFLECTIONS
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    # Lowercased words; hyphenated words ("q-learning") stay one token
+    return _TOKEN.findall(text.lower())
+
+
+def _word_forms(token: str) -> List[str]:
+    # The token itself, then the stems left after removing an inflection ending
+    return [token] + [token[:-len(suffix)] for suffix in INFLECTIONS
+                      if token.endswith(suffix) and len(token) > len(suffix)]
+
+
+def _query_forms(token: str) -> List[str]:
+    # Forms of a query token and of its hyphen parts, as index_item posts item names
+    words = [token] + token.split("-") if "-" in token else [token]
+    return [form for word in words for form in _word_forms(word)]
+
+
+def index_item(postings: Dict[str, Dict[str, List[int]]], category: str, position: int, name: str):
+    # Post the item under its name tokens, their hyphen parts and stems, and the whole name
+    tokens = tokenize(name)
+    words = set(tokens)
+    words.update(part for token in tokens for part in token.split("-"))
+    keys = {form for word in words for form in _word_forms(word)}
+    if len(tokens) > 1:
+        keys.add(" ".join(tokens))
+    for key in keys:
+        postings.setdefault(key, {}).setdefault(category, []).append(position)
+
+
+class KnowledgeIndex:
+    """
+    Inverted index over a knowledge base of {category: {"items": [...]}}, built once.
+    - Category names (possibly multi-word) map to their declaration order
+    - Keywords map to (category, declaration order); the longest matching keyword is
+      the most specific, ties go to the keyword declared first
+    - Item-name tokens, their hyphen parts and stems, and whole multi-word names have
+      posting lists of item positions per category
+    Lookups cost O(query tokens), independent of vocabulary and item counts. A knowledge
+    base with prebuilt name_postings() (see KnowledgeBase) is indexed without loading items.
+    """
+
+    def __init__(self, knowledge_base: Dict[str, Dict[str, Any]], keyword_to_category: Dict[str, str]):
+        self.knowledge_base = knowledge_base
+        self.categories = {" ".join(tokenize(name)): (order, name) for order, name in enumerate(knowledge_base)}
+        self.max_category_words = max((len(tokenize(name)) for name in self.categories), default=1)
+        self.keywords = {keyword.lower(): (category, order)
+                         for order, (keyword, category) in enumerate(keyword_to_category.items())}
+        prebuilt = getattr(knowledge_base, "name_postings", None)
+        if prebuilt is not None:
+            self.postings: Dict[str, Dict[str, List[int]]] = prebuilt()
+            return
+        self.postings = {}
+        for category, content in knowledge_base.items():
+            for position, item in enumerate(content.get("items", [])):
+                if isinstance(item, dict):
+                    index_item(self.postings, category, position, item.get("name", ""))
+
+    def match_category(self, topic: str) -> Optional[str]:
+        # Earliest-declared category whose name appears as a phrase in the topic, with
+        # hyphenated words taken whole and as their parts
+        tokens = tokenize(topic)
+        sequences = [tokens]
+        if any("-" in token for token in tokens):
+            sequences.append([part for token in tokens for part in token.split("-")])
+        best = None
+        for sequence in sequences:
+            for n in range(1, self.max_category_words + 1):
+                for i in range(len(sequence) - n + 1):
+                    hit = self.categories.get(" ".join(sequence[i:i + n]))
+                    if hit is not None and (best is None or hit < best):
+                        best = hit
+        return best[1] if best else None
+
+    def best_keyword(self, topic: str) -> Optional[Tuple[str, str]]:
+        # (keyword, category) of the longest keyword in the topic, or None
+        best = None
+        for token in tokenize(topic):
+            for form in _query_forms(token):
+                hit = self.keywords.get(form)
+                if hit is None:
+                    continue
+                rank = (-len(form), hit[1])
+                if best is None or rank < best[0]:
+                    best = (rank, form, hit[0])
+        return (best[1], best[2]) if best else None
+
+    def positions_matching(self, category: str, keyword: str) -> List[int]:
+        # Positions of the category's items whose name contains the keyword as a word or phrase
+        return self.postings.get(keyword.lower(), {}).get(category, [])
+
+    def items_matching(self, category: str, keyword: str) -> List[Any]:
+        items = self.knowledge_base[category]["items"]
+        return [items[position] for position in self.positions_matching(category, keyword)]
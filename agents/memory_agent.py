@@ -1,100 +1,632 @@
-import json
+import atexit
+import logging
 import os
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import numpy as np
-from numpy.linalg import norm
+import scipy.sparse as sp
 
+from agents.async_support import run_blocking
+from agents.embeddings import CharFrequencyBackend, embed, embed_batch, get_backend
+from agents.memory_store import SQLiteMemoryStore, format_record_id, parse_record_id
+from agents.vector_file import MappedVectorIndex, VectorFile
+from agents.vector_index import IVFVectorIndex, SparseVectorIndex, normalize_rows, recall_report, top_k
+
+logger = logging.getLogger(__name__)
+
+# Back-off bounds (seconds) for the write-behind flusher after a failed commit
+FLUSH_RETRY_MIN = 0.1
+FLUSH_RETRY_MAX = 5.0
+# Similarity cells computed per block when compaction looks for near-duplicates
+DEDUPE_BLOCK_CELLS = 1 << 22
 
-def embed(text):
-    vec = np.zeros(26)
-    text = text.lower()
-    for c in text:
-        if 'a' <= c <= 'z':
-            vec[ord(c)-ord('a')] += 1
-    return vec
 
 class MemoryAgent:
     """
     Manages structured memory with vector search capabilities.
     - Stores records with metadata (topic, keywords, timestamp, source, confidence)
-    - Uses character-frequency embeddings and cosine similarity
-    - Persistent JSON storage with threshold-based retrieval
+    - Pluggable embedding backend (letter frequencies by default, or hashed n-grams)
+      with cosine similarity; vectors are kept per backend so stores stay compatible
+    - Dense vectors live in a memory-mapped float32 file shared by all processes;
+      retrieval reads straight from the mapping
+    - Optional IVF approximate index (index="ivf") for very large stores
+    - Persistent SQLite storage (append-only inserts) with threshold-based retrieval
+    - Imports a legacy JSON store sitting next to the database on first use
+    - Optional write-behind mode: stores are buffered (and immediately retrievable) and a
+      background thread group-commits them by batch size or age, with a selectable
+      durability policy ("none", "flush" or "fsync" per batch)
+    - Bounded size: TTL, max records / max bytes with least-recently-hit eviction, and
+      collapsing of near-duplicate entries, applied by a compaction pass that can run
+      in the background while retrieval keeps serving the previous vector file
     """
     
-    def __init__(self, store_path: str = "memory/memory_store.json"):
+    def __init__(self, store_path: str = "memory/memory_store.db", index: str = "exact",
+                 nprobe: int = 8, n_lists: int = 0, embedding="charfreq",
+                 write_mode: str = "sync", durability: str = "flush",
+                 batch_size: int = 64, flush_interval: float = 0.05,
+                 max_records: Optional[int] = None, max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None, dedupe_threshold: Optional[float] = None,
+                 compact_interval: Optional[float] = None):
+        root, ext = os.path.splitext(store_path)
+        if ext == ".json":
+            # Old-style path: keep the JSON as the migration source
+            store_path = root + ".db"
         self.file = store_path
-        if not os.path.exists("memory"):
-            os.makedirs("memory")
-        if not os.path.exists(self.file):
-            with open(self.file, "w") as f:
-                json.dump([], f)
-
-    def _load(self) -> List[Dict[str, Any]]:
-        with open(self.file, "r") as f:
-            try:
-                data = json.load(f)
-            except:
-                data = []
-        return data
+        directory = os.path.dirname(self.file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        self.store_backend = SQLiteMemoryStore(self.file, durability=durability)
+        self.store_backend.migrate_json(root + ".json")
+        self.embedding = get_backend(embedding)
+        # The letter-frequency vector is stored inline; other backends get their own rows
+        self._vector_key = None if isinstance(self.embedding, CharFrequencyBackend) else self.embedding.name
+        if index == "ivf":
+            if self.embedding.sparse:
+                raise ValueError("index='ivf' requires a dense embedding backend")
+            # Approximate search; nprobe trades recall for latency
+            self.index = IVFVectorIndex(self.embedding.dim, n_lists=n_lists, nprobe=nprobe,
+                                        path=f"{root}.{self.embedding.name}.ivf.npz")
+        elif index == "exact":
+            # Dense vectors are searched straight from the shared vector file (set up in _sync)
+            self.index = SparseVectorIndex(self.embedding.dim) if self.embedding.sparse else None
+        else:
+            raise ValueError(f"Unknown index type: {index}")
+        self._root = root
+        self.vector_file = None
+        self._indexed_rows = 0
+        self._synced_seq = 0
+        self._tail = None
+        self._generation = None
+        self._lock = threading.Lock()
+        self._sync()
+
+        if write_mode not in ("sync", "behind"):
+            raise ValueError(f"Unknown write mode: {write_mode}")
+        self.write_mode = write_mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._pending_since = None
+        self._pending_matrix = None
+        self._reserved_ids = []
+        self._pending_cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self.write_stats = {
+            "flushes": 0, "flushed_records": 0, "max_queue_depth": 0,
+            "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0,
+            "failed_flushes": 0, "last_flush_error": None,
+        }
+        self._flusher = None
+        if write_mode == "behind":
+            self._flusher = threading.Thread(target=self._flush_loop, name="memory-flusher", daemon=True)
+            self._flusher.start()
+
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.dedupe_threshold = dedupe_threshold
+        self.compact_interval = compact_interval
+        self.compaction_stats = {}
+        self._compaction_failures = 0
+        self._access = {}
+        self._access_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compact_stop = threading.Event()
+        self._compactor = None
+        self._clear_listeners = []
+        if compact_interval:
+            self._compactor = threading.Thread(target=self._compact_loop, name="memory-compactor", daemon=True)
+            self._compactor.start()
+        if self._flusher is not None or self._compactor is not None:
+            atexit.register(self.close)
 
-    def _save(self, data: List[Dict[str, Any]]):
-        with open(self.file, "w") as f:
-            json.dump(data, f, indent=2)
+    def _sync(self, writer: bool = False):
+        # Pull entries written since the last sync (by us or another process).
+        # Only writers wait for the vector file lock; a reader that finds it busy
+        # scores the not-yet-appended rows from SQLite instead of blocking.
+        with self._lock:
+            for attempt in range(3):
+                try:
+                    return self._sync_locked(writer)
+                except FileNotFoundError:
+                    # Our vector file was removed by a clear/compaction in another process
+                    # after we read the generation: resync on the current generation
+                    if attempt == 2:
+                        raise
+                    self._generation = None
+
+    def _sync_locked(self, writer: bool):
+        # Caller holds self._lock
+        generation = self.store_backend.generation()
+        if generation != self._generation:
+            self._open_generation(generation)
+        if self.vector_file is None:
+            rows = self.store_backend.vectors_since(self._synced_seq, self._vector_key)
+            if rows:
+                self.index.add([row[0] for row in rows], self._decode_rows(rows))
+                self._synced_seq = rows[-1][3]
+            return
+        self._tail = None
+        if self.store_backend.max_seq() > self.vector_file.max_seq:
+            if not self._backfill_vector_file(blocking=writer):
+                rows = self.store_backend.vectors_since(self.vector_file.max_seq, self._vector_key)
+                if rows:
+                    self._tail = (normalize_rows(self._decode_rows(rows)),
+                                  np.array([row[0] for row in rows], dtype=np.int64))
+        if isinstance(self.index, IVFVectorIndex):
+            matrix, ids = self.vector_file.view()
+            if len(ids) > self._indexed_rows:
+                self.index.add(ids[self._indexed_rows:], matrix[self._indexed_rows:])
+                self._indexed_rows = len(ids)
+
+    def _open_generation(self, generation: int):
+        # A new store generation (e.g. after clear) starts from fresh vector files
+        self._generation = generation
+        self._indexed_rows = 0
+        self._synced_seq = 0
+        if self.index is not None:
+            self.index.reset()
+        if self.embedding.sparse:
+            return
+        VectorFile.remove_generations(self._root, keep=generation)
+        self.vector_file = VectorFile(f"{self._root}.{self.embedding.name}.g{generation}",
+                                      self.embedding.dim)
+        if not isinstance(self.index, IVFVectorIndex):
+            self.index = MappedVectorIndex(self.vector_file)
+
+    def _backfill_vector_file(self, blocking: bool = True) -> bool:
+        # Append every stored entry the vector file does not have yet
+        if not self.vector_file.lock.acquire(blocking):
+            return False
+        try:
+            if not self.vector_file.exists():
+                raise FileNotFoundError(self.vector_file.vectors_path)
+            rows = self.store_backend.vectors_since(self.vector_file.max_seq, self._vector_key)
+            if rows:
+                self.vector_file.write_rows(np.array([row[0] for row in rows], dtype=np.int64),
+                                            np.array([row[3] for row in rows], dtype=np.int64),
+                                            normalize_rows(self._decode_rows(rows)),
+                                            fsync=self.store_backend.durability == "fsync")
+        finally:
+            self.vector_file.lock.release()
+        return True
+
+    def _decode_rows(self, rows):
+        # Entries stored before this backend was in use get embedded now and backfilled
+        missing = [i for i, row in enumerate(rows) if row[2] is None]
+        if missing:
+            vectors = self.embedding.embed_batch([rows[i][1] for i in missing])
+            blobs = self.embedding.encode(vectors)
+            self.store_backend.put_vectors(self.embedding.name,
+                                           [(rows[i][0], blob) for i, blob in zip(missing, blobs)])
+            rows = list(rows)
+            for i, blob in zip(missing, blobs):
+                rows[i] = (rows[i][0], rows[i][1], blob, rows[i][3])
+        return self.embedding.decode([row[2] for row in rows])
 
     def store(self, topic: str, record: Dict[str, Any]) -> str:
         # Store a memory record with embedding and metadata
-        vec = embed(topic)
-        memory = self._load()
-        record_id = f"mem_{len(memory) + 1}"
-        
-        entry = {
-            "id": record_id,
-            "topic": topic,
-            "vector": vec.tolist(),
-            "record": record,
-            "timestamp": datetime.now().isoformat(),
-            "confidence": record.get("confidence", 0.8),
-            "source_agent": record.get("source_agent", "unknown"),
-            "keywords": record.get("keywords", [])
-        }
-        memory.append(entry)
-        self._save(memory)
-        return record_id
+        return self.store_many([(topic, record)])[0]
+
+    def store_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        # Store (topic, record) pairs with one batched embedding and a single commit
+        # (or a single hand-off to the write-behind buffer)
+        if not items:
+            return []
+        topics = [topic for topic, _ in items]
+        query_vectors = self._embed_queries(topics)
+        # The stored letter-frequency vector is the query vector when charfreq is the backend
+        if self._vector_key is None:
+            vecs = query_vectors
+        else:
+            vecs = embed_batch(topics) if len(topics) > 1 else embed(topics[0])[None, :]
+        blobs = self.embedding.encode(query_vectors) if self._vector_key else None
+        timestamp = datetime.now().isoformat()
+        record_ids = [None] * len(items)
+        fresh = []
+        for i, (topic, record) in enumerate(items):
+            entry = {
+                "topic": topic,
+                "record": record,
+                "timestamp": timestamp,
+                "confidence": record.get("confidence", 0.8),
+                "source_agent": record.get("source_agent", "unknown"),
+                "keywords": record.get("keywords", [])
+            }
+            query_vector = query_vectors[i:i + 1]
+            extra_vectors = {self._vector_key: blobs[i]} if blobs else None
+            if self.dedupe_threshold is not None:
+                duplicate = self._collapse_into_duplicate(query_vector, entry)
+                if duplicate is not None:
+                    record_ids[i] = format_record_id(duplicate)
+                    continue
+            fresh.append((i, (entry, vecs[i], extra_vectors, query_vector)))
+        if not fresh:
+            return record_ids
+
+        if self.write_mode == "sync":
+            memory_ids = self.store_backend.insert_many([item[:3] for _, item in fresh])
+            self._sync(writer=True)
+        else:
+            with self._pending_cond:
+                if len(self._reserved_ids) < len(fresh):
+                    self._reserved_ids += self.store_backend.reserve_ids(max(self.batch_size, len(fresh)))
+                memory_ids = self._reserved_ids[:len(fresh)]
+                del self._reserved_ids[:len(fresh)]
+                if not self._pending:
+                    self._pending_since = time.monotonic()
+                for memory_id, (_, item) in zip(memory_ids, fresh):
+                    self._pending[memory_id] = item
+                self._pending_matrix = None
+                depth = len(self._pending)
+                self.write_stats["max_queue_depth"] = max(self.write_stats["max_queue_depth"], depth)
+                if depth >= self.batch_size:
+                    self._pending_cond.notify()
+        for memory_id, (i, _) in zip(memory_ids, fresh):
+            record_ids[i] = format_record_id(memory_id)
+        return record_ids
+
+    def _collapse_into_duplicate(self, query_vector, entry: Dict[str, Any]) -> Optional[int]:
+        # Overwrite the closest entry instead of adding a near-identical one
+        hits = self._search(query_vector, 1)
+        if not hits or hits[0][1] < self.dedupe_threshold:
+            return None
+        memory_id = hits[0][0]
+        with self._pending_cond:
+            if memory_id in self._pending:
+                _, vec, extra_vectors, vector = self._pending[memory_id]
+                self._pending[memory_id] = (entry, vec, extra_vectors, vector)
+                return memory_id
+        return memory_id if self.store_backend.update_entry(memory_id, entry) else None
+
+    def _flush_loop(self):
+        # Background group commit: flush when a batch fills up or the oldest entry ages out
+        retry = 0.0
+        while True:
+            with self._pending_cond:
+                while not self._closed and len(self._pending) < self.batch_size:
+                    if self._pending:
+                        remaining = self.flush_interval - (time.monotonic() - self._pending_since)
+                        if remaining <= 0:
+                            break
+                        self._pending_cond.wait(remaining)
+                    else:
+                        self._pending_cond.wait()
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                retry = 0.0
+            except Exception as exc:
+                # Keep the buffer and the thread alive (disk full, database locked...):
+                # log, count the failure and retry with exponential back-off
+                retry = min(FLUSH_RETRY_MAX, max(FLUSH_RETRY_MIN, 2 * retry))
+                logger.exception("memory flush failed; retrying in %.1fs", retry)
+                with self._pending_cond:
+                    self.write_stats["failed_flushes"] += 1
+                    self.write_stats["last_flush_error"] = repr(exc)
+                    if not self._closed:
+                        self._pending_cond.wait(retry)
+
+    def flush(self):
+        # Commit every buffered store, one transaction per batch
+        with self._flush_lock:
+            while True:
+                with self._pending_cond:
+                    batch = list(self._pending.items())[:self.batch_size]
+                if not batch:
+                    return
+                start = time.perf_counter()
+                self.store_backend.insert_many(
+                    [(entry, vec, extra_vectors) for _, (entry, vec, extra_vectors, _) in batch],
+                    ids=[memory_id for memory_id, _ in batch],
+                )
+                self._sync(writer=True)
+                with self._pending_cond:
+                    for memory_id, _ in batch:
+                        self._pending.pop(memory_id, None)
+                    self._pending_matrix = None
+                    self._pending_since = time.monotonic()
+                elapsed = 1000 * (time.perf_counter() - start)
+                stats = self.write_stats
+                stats["flushes"] += 1
+                stats["flushed_records"] += len(batch)
+                stats["last_flush_ms"] = elapsed
+                stats["max_flush_ms"] = max(stats["max_flush_ms"], elapsed)
+                stats["total_flush_ms"] += elapsed
+
+    def close(self):
+        # Stop background threads and commit whatever is still buffered
+        if self._compactor is not None:
+            self._compact_stop.set()
+            self._compactor.join()
+            self._compactor = None
+        if self._flusher is not None:
+            with self._pending_cond:
+                self._closed = True
+                self._pending_cond.notify_all()
+            self._flusher.join()
+            self._flusher = None
+        atexit.unregister(self.close)
+        self.flush()
+        self._flush_access()
+
+    def get_write_stats(self) -> Dict[str, Any]:
+        with self._pending_cond:
+            stats = dict(self.write_stats, queue_depth=len(self._pending))
+        stats["mean_flush_ms"] = stats["total_flush_ms"] / stats["flushes"] if stats["flushes"] else 0.0
+        return stats
+
+    async def store_async(self, topic: str, record: Dict[str, Any]) -> str:
+        return await run_blocking(self.store, topic, record)
+
+    async def retrieve_async(self, topic: str, threshold: float = 0.85) -> Optional[Dict[str, Any]]:
+        return await run_blocking(self.retrieve, topic, threshold)
+
+    async def retrieve_many_async(self, topics: List[str], threshold: float = 0.85) -> List[Optional[Dict[str, Any]]]:
+        return await run_blocking(self.retrieve_many, topics, threshold)
 
     def retrieve(self, topic: str, threshold: float = 0.85) -> Optional[Dict[str, Any]]:
-        # Retrieve a memory record by topic using cosine similarity
-        vec = embed(topic)
-        memory = self._load()
-        
-        if not memory:
+        # Retrieve the best memory record by topic using cosine similarity
+        matches = self.retrieve_top_k(topic, k=1, threshold=threshold)
+        return matches[0]["record"] if matches else None
+
+    def retrieve_many(self, topics: List[str], threshold: float = 0.85) -> List[Optional[Dict[str, Any]]]:
+        # Best record per topic (None below threshold), scored in one batched pass
+        if not topics:
+            return []
+        hits = self._search_many(self._embed_queries(list(topics)), 1)
+        best = [query_hits[0] if query_hits and query_hits[0][1] > 0 and query_hits[0][1] >= threshold
+                else None for query_hits in hits]
+        records = self._get_records({hit[0] for hit in best if hit is not None})
+        self._note_access(hit[0] for hit in best if hit is not None and hit[0] in records)
+        return [records.get(hit[0]) if hit is not None else None for hit in best]
+
+    def retrieve_top_k(self, topic: str, k: int = 5, threshold: float = 0.0) -> List[Dict[str, Any]]:
+        # Return up to k scored matches, best first
+        hits = self._search(self._embed_queries([topic]), k)
+        hits = [(memory_id, score) for memory_id, score in hits if score > 0 and score >= threshold]
+        records = self._get_records(memory_id for memory_id, _ in hits)
+        self._note_access(memory_id for memory_id in records)
+        return [
+            {"id": format_record_id(memory_id), "score": score, "record": records[memory_id]}
+            for memory_id, score in hits if memory_id in records
+        ]
+
+    def _search(self, query, k: int):
+        return self._search_many(query, k)[0]
+
+    def _search_many(self, queries, k: int):
+        # Index hits per query, merged with buffered stores and rows not yet in the vector file
+        self._sync()
+        hits = self._merge_pending(self.index.search_many(queries, k), queries, k)
+        tail = self._tail
+        if tail is not None:
+            hits = self._merge_scored(hits, tail[0], tail[1], queries, k)
+        return hits
+
+    def _note_access(self, memory_ids):
+        # Hit counts and last-access times are batched in memory and persisted on compaction
+        now = time.time()
+        with self._access_lock:
+            for memory_id in memory_ids:
+                count, _ = self._access.get(memory_id, (0, now))
+                self._access[memory_id] = (count + 1, now)
+            if len(self._access) < 1024:
+                return
+        self._flush_access()
+
+    def _flush_access(self):
+        with self._access_lock:
+            accesses, self._access = self._access, {}
+        self.store_backend.record_access(accesses)
+
+    def entry_stats(self, record_id: str) -> Optional[Dict[str, Any]]:
+        # Hit count and last access time of one entry
+        memory_id = parse_record_id(record_id)
+        stats = self.store_backend.access_stats([memory_id]).get(memory_id)
+        with self._access_lock:
+            count, last = self._access.get(memory_id, (0, None))
+        if stats is None:
             return None
-            
-        best_score = 0
-        best_match = None
-        
-        for entry in memory:
-            mem_vec = np.array(entry["vector"])
-            score = np.dot(vec, mem_vec) / (norm(vec) * norm(mem_vec) + 1e-6)
-            if score > best_score:
-                best_score = score
-                best_match = entry["record"]
-        if best_score >= threshold:
-            return best_match
-        return None
-    
+        hits, last_access = stats
+        return {"hits": hits + count, "last_access": last or last_access}
+
+    def compact(self) -> Dict[str, Any]:
+        """
+        Apply TTL, near-duplicate collapsing and capacity limits in one pass.
+        A replacement vector file is written before the deletions are published, so
+        retrieval keeps using the current mapping until it switches generations.
+        """
+        self.flush()
+        self._flush_access()
+        with self._compact_lock:
+            generation = self.store_backend.generation()
+            doomed = set()
+            stats = {"expired": 0, "collapsed": 0, "evicted": 0}
+            if self.ttl is not None:
+                expired = self.store_backend.expired_ids(time.time() - self.ttl)
+                doomed.update(expired)
+                stats["expired"] = len(expired)
+
+            rows = None
+            merged_hits = {}
+            if self.dedupe_threshold is not None or not self.embedding.sparse:
+                rows = self.store_backend.vectors_since(0, self._vector_key)
+            if self.dedupe_threshold is not None and rows:
+                collapsed = self._duplicate_ids(rows, doomed)
+                access = self.store_backend.access_stats(collapsed)
+                for duplicate, keeper in collapsed.items():
+                    hits, last = access.get(duplicate, (0, None))
+                    prev_hits, prev_last = merged_hits.get(keeper, (0, None))
+                    merged_hits[keeper] = (prev_hits + hits, max(prev_last or 0, last or 0) or None)
+                doomed.update(collapsed)
+                stats["collapsed"] = len(collapsed)
+
+            live = [(memory_id, size or 0) for memory_id, size in self.store_backend.lru_entries()
+                    if memory_id not in doomed]
+            count, total = len(live), sum(size for _, size in live)
+            for memory_id, size in live:
+                if (self.max_records is None or count <= self.max_records) and \
+                        (self.max_bytes is None or total <= self.max_bytes):
+                    break
+                doomed.add(memory_id)
+                merged_hits.pop(memory_id, None)
+                count -= 1
+                total -= size
+                stats["evicted"] += 1
+
+            if doomed:
+                new_generation = self.store_backend.reserve_generation()
+                vector_file = None
+                if not self.embedding.sparse:
+                    vector_file = self._build_vector_file(new_generation, rows, doomed)
+                if not self.store_backend.delete_entries(sorted(doomed), generation, new_generation, merged_hits):
+                    # Store was cleared meanwhile; drop the half-built generation
+                    if vector_file is not None:
+                        vector_file.remove()
+                    stats["aborted"] = True
+                self._sync()
+            stats["remaining"], stats["bytes"] = self.store_backend.usage()
+            self.compaction_stats = dict(stats, failed_compactions=self._compaction_failures)
+            return stats
+
+    def _duplicate_ids(self, rows, exclude) -> Dict[int, int]:
+        # Newest first, each entry collapses into the most similar newer entry that was
+        # kept, if their cosine is at least dedupe_threshold; the similarities come from
+        # blockwise vectors @ vectors.T. Returns {duplicate id: kept id}.
+        rows = sorted((row for row in rows if row[0] not in exclude), key=lambda row: -row[0])
+        if len(rows) < 2:
+            return {}
+        vectors = self._decode_rows(rows)
+        if self.embedding.sparse:
+            norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+            vectors = sp.diags(1.0 / np.where(norms > 0, norms, 1.0)) @ vectors
+            transposed = vectors.T.tocsc()
+        else:
+            vectors = normalize_rows(vectors)
+            transposed = vectors.T
+        ids = [row[0] for row in rows]
+        kept = np.zeros(len(rows), dtype=bool)
+        duplicates = {}
+        block = max(1, DEDUPE_BLOCK_CELLS // len(rows))
+        for start in range(0, len(rows), block):
+            sims = vectors[start:start + block] @ transposed
+            sims = sims.toarray() if sp.issparse(sims) else sims
+            for offset, row_sims in enumerate(sims):
+                i = start + offset
+                candidates = np.flatnonzero(kept[:i] & (row_sims[:i] >= self.dedupe_threshold))
+                if len(candidates):
+                    duplicates[ids[i]] = ids[candidates[np.argmax(row_sims[candidates])]]
+                else:
+                    kept[i] = True
+        return duplicates
+
+    def _build_vector_file(self, generation: int, rows, doomed) -> VectorFile:
+        vector_file = VectorFile(f"{self._root}.{self.embedding.name}.g{generation}", self.embedding.dim)
+        keep = [row for row in rows if row[0] not in doomed]
+        if keep:
+            with vector_file.lock:
+                vector_file.write_rows(np.array([row[0] for row in keep], dtype=np.int64),
+                                       np.array([row[3] for row in keep], dtype=np.int64),
+                                       normalize_rows(self._decode_rows(keep)),
+                                       fsync=self.store_backend.durability == "fsync")
+        return vector_file
+
+    def _compact_loop(self):
+        retry = 0.0
+        while not self._compact_stop.wait(retry or self.compact_interval):
+            try:
+                self.compact()
+                retry = 0.0
+            except Exception as exc:
+                # As in _flush_loop: a failed pass (e.g. database locked) must not stop
+                # size enforcement; log it, count it and retry sooner with back-off
+                retry = min(self.compact_interval, max(FLUSH_RETRY_MIN, 2 * retry))
+                logger.exception("memory compaction failed; retrying in %.1fs", retry)
+                self._compaction_failures += 1
+                self.compaction_stats = dict(self.compaction_stats, failed_compactions=self._compaction_failures,
+                                             last_compaction_error=repr(exc))
+
+    def _embed_queries(self, topics: List[str]):
+        if self._vector_key is None:
+            return embed_batch(topics) if len(topics) > 1 else embed(topics[0])[None, :]
+        return self.embedding.embed_batch(topics)
+
+    def _merge_pending(self, hits, queries, k: int):
+        # Fold buffered (not yet committed) stores into the index results
+        with self._pending_cond:
+            if not self._pending:
+                return hits
+            if self._pending_matrix is None:
+                ids = np.fromiter(self._pending.keys(), dtype=np.int64, count=len(self._pending))
+                vectors = [item[3] for item in self._pending.values()]
+                matrix = sp.vstack(vectors).tocsr() if self.embedding.sparse else normalize_rows(np.vstack(vectors))
+                self._pending_matrix = (matrix, ids)
+            matrix, ids = self._pending_matrix
+        return self._merge_scored(hits, matrix, ids, queries, k)
+
+    def _merge_scored(self, hits, matrix, ids, queries, k: int):
+        # Score extra rows outside the index and merge them with each query's hits by id
+        if self.embedding.sparse:
+            scores = (sp.csr_matrix(queries) @ matrix.T).toarray()
+        else:
+            scores = normalize_rows(queries) @ matrix.T
+        merged = []
+        for query_hits, row in zip(hits, scores):
+            best = dict(query_hits)
+            for memory_id, score in top_k(row, ids, k):
+                best[memory_id] = max(score, best.get(memory_id, score))
+            merged.append(sorted(best.items(), key=lambda hit: (-hit[1], hit[0]))[:k])
+        return merged
+
+    def _get_records(self, memory_ids) -> Dict[int, Dict[str, Any]]:
+        records = {}
+        missing = []
+        with self._pending_cond:
+            for memory_id in memory_ids:
+                if memory_id in self._pending:
+                    records[memory_id] = self._pending[memory_id][0]["record"]
+                else:
+                    missing.append(memory_id)
+        records.update(self.store_backend.get_records(missing))
+        return records
+
+    def _pending_entries(self) -> List[Dict[str, Any]]:
+        with self._pending_cond:
+            return [item[0] for item in self._pending.values()]
+
+    def recall_report(self, topics: List[str], k: int = 1, nprobe_values=(1, 2, 4, 8, 16, 32),
+                      threshold: float = 0.85) -> List[Dict[str, Any]]:
+        # Measure IVF recall and latency against an exact scan for sample topics
+        if not isinstance(self.index, IVFVectorIndex):
+            raise ValueError("recall_report requires index='ivf'")
+        self._sync()
+        queries = self.embedding.embed_batch(topics)
+        return recall_report(self.index, queries, k, nprobe_values, threshold)
+
     def search_by_keywords(self, keywords: List[str]) -> List[Dict[str, Any]]:
-        memory = self._load()
-        results = []
-        for entry in memory:
-            entry_keywords = entry.get("keywords", [])
-            if any(kw in entry_keywords for kw in keywords):
-                results.append(entry["record"])
+        results = self.store_backend.search_keywords(keywords)
+        results.extend(entry["record"] for entry in self._pending_entries()
+                       if any(kw in (entry.get("keywords") or []) for kw in keywords))
         return results
     
     def get_all(self) -> List[Dict[str, Any]]:
-        memory = self._load()
-        return [entry["record"] for entry in memory]
+        return self.store_backend.all_records() + [entry["record"] for entry in self._pending_entries()]
     
     def clear(self):
-        self._save([])
+        with self._pending_cond:
+            self._pending.clear()
+            self._pending_matrix = None
+        with self._flush_lock:
+            self.store_backend.clear()
+        self._sync()
+        for callback in self._clear_listeners:
+            callback()
+
+    def add_clear_listener(self, callback):
+        # Called after clear(), e.g. to drop caches built from the old contents
+        self._clear_listeners.append(callback)
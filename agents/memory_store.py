@@ -0,0 +1,370 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    id INTEGER PRIMARY KEY,
+    seq INTEGER,
+    topic TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    record TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    confidence REAL,
+    source_agent TEXT,
+    keywords TEXT,
+    created REAL,
+    size INTEGER,
+    hits INTEGER NOT NULL DEFAULT 0,
+    last_access REAL
+);
+CREATE INDEX IF NOT EXISTS memories_seq ON memories (seq);
+CREATE TABLE IF NOT EXISTS memory_keywords (
+    keyword TEXT NOT NULL,
+    memory_id INTEGER NOT NULL,
+    PRIMARY KEY (keyword, memory_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS vectors (
+    backend TEXT NOT NULL,
+    memory_id INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (backend, memory_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+# Durability policy -> SQLite synchronous level
+SYNCHRONOUS_PRAGMA = {"none": "OFF", "flush": "NORMAL", "fsync": "FULL"}
+
+
+def format_record_id(memory_id: int) -> str:
+    return f"mem_{memory_id}"
+
+
+def parse_record_id(record_id: str) -> Optional[int]:
+    if isinstance(record_id, str) and record_id.startswith("mem_"):
+        try:
+            return int(record_id[4:])
+        except ValueError:
+            return None
+    return None
+
+
+class SQLiteMemoryStore:
+    """
+    Embedded SQLite storage engine for memory entries.
+    - One row per entry, inserted in its own short transaction (no whole-file rewrites)
+    - Keyword postings table so keyword search is an index lookup
+    - Letter-frequency vectors inline; other embedding backends in a per-backend vectors table
+    - Monotonic ID allocator kept in the meta table, never reused after deletes; ids can
+      be reserved in blocks ahead of the insert (write-behind)
+    - Every insert also gets a commit sequence number, so readers can sync incrementally
+      even when reserved ids are committed out of order
+    - Per-entry creation time, size, hit count and last access for TTL/LRU eviction
+    - Removals publish a new generation number so readers rebuild their vector views
+    - One-shot import of the legacy JSON list store
+    """
+
+    def __init__(self, path: str, durability: str = "flush"):
+        if durability not in SYNCHRONOUS_PRAGMA:
+            raise ValueError(f"Unknown durability policy: {durability}")
+        self.path = path
+        self.durability = durability
+        self._local = threading.local()
+        with self._transaction() as conn:
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('next_id', 1)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) "
+                         "SELECT 'next_generation', value + 1 FROM meta WHERE key = 'generation'")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) "
+                         "SELECT 'next_seq', COALESCE(MAX(seq), 0) + 1 FROM memories")
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections are per-thread; cache one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={SYNCHRONOUS_PRAGMA[self.durability]}")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connect())
+
+    def _bump(self, conn: sqlite3.Connection, key: str, count: int) -> int:
+        start = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0]
+        conn.execute("UPDATE meta SET value = ? WHERE key = ?", (start + count, key))
+        return start
+
+    def reserve_ids(self, count: int) -> List[int]:
+        # Hand out a block of ids now for entries that will be inserted later
+        with self._transaction() as conn:
+            start = self._bump(conn, "next_id", count)
+        return list(range(start, start + count))
+
+    def insert_many(self, items: List[Tuple[Dict[str, Any], np.ndarray, Optional[Dict[str, bytes]]]],
+                    ids: Optional[List[int]] = None) -> List[int]:
+        # Insert (entry, vector, {backend: blob}) items in one transaction; returns their ids.
+        # Ids come from the allocator unless pre-reserved ones are passed in.
+        if not items:
+            return []
+        with self._transaction() as conn:
+            if ids is None:
+                start = self._bump(conn, "next_id", len(items))
+                ids = list(range(start, start + len(items)))
+            seq = self._bump(conn, "next_seq", len(items))
+            for offset, (memory_id, (entry, vector, extra_vectors)) in enumerate(zip(ids, items)):
+                self._write_row(conn, memory_id, seq + offset, entry, vector)
+                for backend, blob in (extra_vectors or {}).items():
+                    conn.execute(
+                        "INSERT OR REPLACE INTO vectors (backend, memory_id, data) VALUES (?, ?, ?)",
+                        (backend, memory_id, blob),
+                    )
+        return ids
+
+    def _write_row(self, conn: sqlite3.Connection, memory_id: int, seq: int,
+                   entry: Dict[str, Any], vector: np.ndarray):
+        keywords = entry.get("keywords") or []
+        record = json.dumps(entry["record"])
+        conn.execute(
+            "INSERT INTO memories (id, seq, topic, vector, record, timestamp, confidence, source_agent, "
+            "keywords, created, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                memory_id,
+                seq,
+                entry["topic"],
+                np.asarray(vector, dtype=np.float32).tobytes(),
+                record,
+                entry["timestamp"],
+                entry.get("confidence"),
+                entry.get("source_agent"),
+                json.dumps(keywords),
+                entry.get("created", time.time()),
+                len(record),
+            ),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO memory_keywords (keyword, memory_id) VALUES (?, ?)",
+            [(kw, memory_id) for kw in keywords if isinstance(kw, str)],
+        )
+
+    def update_entry(self, memory_id: int, entry: Dict[str, Any]) -> bool:
+        # Replace an entry's payload in place (near-duplicate collapse); the vector stays
+        keywords = entry.get("keywords") or []
+        record = json.dumps(entry["record"])
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE memories SET record = ?, timestamp = ?, confidence = ?, source_agent = ?, "
+                "keywords = ?, size = ?, hits = hits + 1, last_access = ? WHERE id = ?",
+                (record, entry["timestamp"], entry.get("confidence"), entry.get("source_agent"),
+                 json.dumps(keywords), len(record), time.time(), memory_id),
+            ).rowcount
+            if updated:
+                conn.execute("DELETE FROM memory_keywords WHERE memory_id = ?", (memory_id,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO memory_keywords (keyword, memory_id) VALUES (?, ?)",
+                    [(kw, memory_id) for kw in keywords if isinstance(kw, str)],
+                )
+        return bool(updated)
+
+    def record_access(self, accesses: Dict[int, Tuple[int, float]]):
+        # Apply batched {id: (hit count, last access time)} updates
+        if not accesses:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE memories SET hits = hits + ?, last_access = MAX(COALESCE(last_access, 0), ?) "
+                "WHERE id = ?",
+                [(count, last, memory_id) for memory_id, (count, last) in accesses.items()],
+            )
+
+    def expired_ids(self, cutoff: float) -> List[int]:
+        return [row[0] for row in self._connect().execute(
+            "SELECT id FROM memories WHERE created < ?", (cutoff,))]
+
+    def usage(self) -> Tuple[int, int]:
+        # (entry count, total record bytes)
+        return self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM memories").fetchone()
+
+    def lru_entries(self) -> List[Tuple[int, int]]:
+        # (id, size) least recently used first; never-hit entries age from creation
+        return self._connect().execute(
+            "SELECT id, size FROM memories ORDER BY COALESCE(last_access, created), id").fetchall()
+
+    def access_stats(self, memory_ids: Iterable[int]) -> Dict[int, Tuple[int, Optional[float]]]:
+        ids = list(memory_ids)
+        stats = {}
+        conn = self._connect()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for memory_id, hits, last in conn.execute(
+                    f"SELECT id, hits, last_access FROM memories WHERE id IN ({placeholders})", chunk):
+                stats[memory_id] = (hits, last)
+        return stats
+
+    def reserve_generation(self) -> int:
+        with self._transaction() as conn:
+            return self._bump(conn, "next_generation", 1)
+
+    def delete_entries(self, memory_ids: List[int], expected_generation: int, new_generation: int,
+                       merged_hits: Optional[Dict[int, Tuple[int, Optional[float]]]] = None) -> bool:
+        # Remove entries and publish new_generation atomically, unless the store moved
+        # to another generation (e.g. a clear) since the caller looked
+        with self._transaction() as conn:
+            if conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0] != expected_generation:
+                return False
+            for i in range(0, len(memory_ids), 500):
+                chunk = memory_ids[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for table, column in (("memory_keywords", "memory_id"), ("vectors", "memory_id"), ("memories", "id")):
+                    conn.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", chunk)
+            for memory_id, (hits, last) in (merged_hits or {}).items():
+                conn.execute(
+                    "UPDATE memories SET hits = hits + ?, last_access = MAX(COALESCE(last_access, 0), COALESCE(?, 0)) "
+                    "WHERE id = ?", (hits, last, memory_id))
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (new_generation,))
+        return True
+
+    def generation(self) -> int:
+        # Bumped whenever entries are removed, so readers know to rebuild
+        return self._connect().execute(
+            "SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def vectors_since(self, after_seq: int, backend: Optional[str] = None) -> List[Tuple[int, str, Optional[bytes], int]]:
+        # (id, topic, vector blob, seq) for every entry committed after after_seq. With no
+        # backend the inline letter-frequency vector is returned; otherwise the backend's
+        # blob, or None if that entry was written before the backend was in use.
+        conn = self._connect()
+        if backend is None:
+            return conn.execute(
+                "SELECT id, topic, vector, seq FROM memories WHERE seq > ? ORDER BY seq", (after_seq,)
+            ).fetchall()
+        return conn.execute(
+            "SELECT m.id, m.topic, v.data, m.seq FROM memories m "
+            "LEFT JOIN vectors v ON v.memory_id = m.id AND v.backend = ? "
+            "WHERE m.seq > ? ORDER BY m.seq",
+            (backend, after_seq),
+        ).fetchall()
+
+    def put_vectors(self, backend: str, rows: List[Tuple[int, bytes]]):
+        # Backfill backend vectors for existing entries
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors (backend, memory_id, data) "
+                "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM memories WHERE id = ?)",
+                [(backend, memory_id, blob, memory_id) for memory_id, blob in rows],
+            )
+
+    def get_records(self, memory_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        ids = list(memory_ids)
+        records = {}
+        conn = self._connect()
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT id, record FROM memories WHERE id IN ({placeholders})", chunk
+            )
+            for memory_id, record in rows:
+                records[memory_id] = json.loads(record)
+        return records
+
+    def search_keywords(self, keywords: List[str]) -> List[Dict[str, Any]]:
+        keywords = [kw for kw in keywords if isinstance(kw, str)]
+        if not keywords:
+            return []
+        placeholders = ",".join("?" * len(keywords))
+        rows = self._connect().execute(
+            "SELECT id, record FROM memories WHERE id IN "
+            f"(SELECT memory_id FROM memory_keywords WHERE keyword IN ({placeholders})) "
+            "ORDER BY id",
+            keywords,
+        )
+        return [json.loads(record) for _, record in rows]
+
+    def all_records(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute("SELECT record FROM memories ORDER BY id")
+        return [json.loads(record) for (record,) in rows]
+
+    def max_seq(self) -> int:
+        return self._connect().execute("SELECT COALESCE(MAX(seq), 0) FROM memories").fetchone()[0]
+
+    def clear(self):
+        # next_id is left untouched so ids are never reused
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM memory_keywords")
+            conn.execute("DELETE FROM vectors")
+            conn.execute("DELETE FROM memories")
+            generation = self._bump(conn, "next_generation", 1)
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (generation,))
+
+    def migrate_json(self, json_path: str) -> int:
+        # Import a legacy JSON list store once, then rename it out of the way.
+        # The write transaction serializes concurrent migrations.
+        imported = 0
+        with self._transaction() as conn:
+            if not os.path.exists(json_path):
+                return 0
+            with open(json_path, "r") as f:
+                try:
+                    legacy = json.load(f)
+                except ValueError:
+                    legacy = []
+
+            next_id = conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()[0]
+            seq = self._bump(conn, "next_seq", len(legacy))
+            for offset, entry in enumerate(legacy):
+                entry = dict(entry, created=_timestamp_seconds(entry.get("timestamp")))
+                memory_id = parse_record_id(entry.get("id"))
+                if memory_id is None or conn.execute(
+                        "SELECT 1 FROM memories WHERE id = ?", (memory_id,)).fetchone():
+                    memory_id = next_id
+                next_id = max(next_id, memory_id + 1)
+                self._write_row(conn, memory_id, seq + offset, entry, np.asarray(entry["vector"]))
+                imported += 1
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'next_id'", (next_id,))
+            os.replace(json_path, json_path + ".migrated")
+        return imported
+
+
+def _timestamp_seconds(timestamp: Optional[str]) -> float:
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK around a block."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
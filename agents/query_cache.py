@@ -0,0 +1,76 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Same punctuation the Coordinator strips when extracting topics
+_PUNCTUATION = re.compile(r'[?!.,;:\'"()]')
+
+
+def normalize_query(query: str) -> str:
+    # Lowercase, strip punctuation and collapse whitespace
+    return " ".join(_PUNCTUATION.sub("", query.lower()).split())
+
+
+class QueryCache:
+    """
+    Exact-match LRU cache of responses keyed by the normalized query.
+    - Bounded by entry count and by age (ttl seconds, None for no expiry)
+    - Tracks hits, misses, evictions (capacity) and expirations (ttl)
+    - `key` maps a lookup to its cache key; pass None to use hashable keys as given
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 300.0,
+                 key: Optional[Callable[[Any], Hashable]] = normalize_query):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._key = key or (lambda query: query)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query) -> Optional[Any]:
+        key = self._key(query)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and self.ttl is not None and time.monotonic() - item[0] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, query, response: Any):
+        key = self._key(query)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
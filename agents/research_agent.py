@@ -1,198 +1,220 @@
+import heapq
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List
+
+from agents.async_support import run_blocking
+from agents.knowledge_base import DEFAULT_KB_PATH, load_knowledge_base
+from agents.knowledge_index import KnowledgeIndex
+
+KEYWORD_TO_CATEGORY = {
+    "adam": "optimization techniques",
+    "sgd": "optimization techniques",
+    "gradient": "optimization techniques",
+    "descent": "optimization techniques",
+    "optimizer": "optimization techniques",
+    "optimization": "optimization techniques",  
+    "rmsprop": "optimization techniques",
+    "adagrad": "optimization techniques",
+    "nadam": "optimization techniques",
+    "neural": "neural networks",
+    "network": "neural networks",
+    "cnn": "neural networks",
+    "rnn": "neural networks",
+    "lstm": "neural networks",
+    "gru": "neural networks",
+    "transformer": "neural networks",
+    "dnn": "neural networks",
+    "convolutional": "neural networks",
+    "recurrent": "neural networks",
+    "reinforcement": "reinforcement learning",
+    "q-learning": "reinforcement learning",
+    "policy": "reinforcement learning",
+    "actor": "reinforcement learning",
+    "critic": "reinforcement learning",
+    "dqn": "reinforcement learning",
+    "ppo": "reinforcement learning",
+    "regression": "machine learning models",
+    "classification": "machine learning models",
+    "svm": "machine learning models",
+    "decision": "machine learning models",
+    "tree": "machine learning models",
+    "forest": "machine learning models",
+    "k-means": "machine learning models",
+    "clustering": "machine learning models",
+    "bert": "transformers",
+    "gpt": "transformers",
+    "t5": "transformers",
+    "roberta": "transformers",
+    "electra": "transformers",
+    "attention": "transformers",
+    "deep": "neural networks",
+    "learning": "reinforcement learning"
+}
+
+# Loads knowledge base categories for ResearchCursor. Kept apart from AGENT_EXECUTOR:
+# research_async() already runs there, and waiting on nested tasks could exhaust it
+CATEGORY_LOADER = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kb-load")
+
+NO_MATCH_HINT = ("No specific match found. Try queries like: 'What is CNN?', 'Compare Adam and SGD', "
+                 "'Explain Transformers', 'What is LSTM?'")
+
+
 class ResearchAgent:
-    def __init__(self):
-        self.knowledge_base = self._initialize_knowledge_base()
+    def __init__(self, knowledge_base=None):
+        self.knowledge_base = self._initialize_knowledge_base(knowledge_base)
         self.research_count = 0
-    def _initialize_knowledge_base(self):
-        return {
-            "optimization techniques": {
-                "items": [
-                    {"name": "Gradient Descent", "type": "iterative", "complexity": "O(n)", "use_case": "Basic optimization"},
-                    {"name": "Adam", "type": "adaptive", "complexity": "O(n)", "use_case": "Deep learning, fast convergence"},
-                    {"name": "RMSProp", "type": "adaptive", "complexity": "O(n)", "use_case": "RNNs, non-stationary problems"},
-                    {"name": "Adagrad", "type": "adaptive", "complexity": "O(n)", "use_case": "Sparse data, decreasing learning rate"},
-                    {"name": "Nadam", "type": "hybrid", "complexity": "O(n)", "use_case": "Adam with Nesterov momentum"}
-                ],
-                "description": "Methods for minimizing loss functions in machine learning"
-            },
-            "neural networks": {
-                "items": [
-                    {"name": "CNN", "architecture": "Convolutional", "best_for": "Image processing", "strength": "Local feature extraction"},
-                    {"name": "RNN", "architecture": "Recurrent", "best_for": "Sequences", "strength": "Temporal dependencies"},
-                    {"name": "LSTM", "architecture": "Recurrent", "best_for": "Long sequences", "strength": "Vanishing gradient solution"},
-                    {"name": "GRU", "architecture": "Recurrent", "best_for": "Long sequences", "strength": "Simplified LSTM"},
-                    {"name": "Transformer", "architecture": "Attention-based", "best_for": "NLP, sequences", "strength": "Parallelizable, self-attention"},
-                    {"name": "DNN", "architecture": "Fully-connected", "best_for": "General tasks", "strength": "Versatile"}
-                ],
-                "description": "Different neural network architectures for various tasks"
-            },
-            "reinforcement learning": {
-                "items": [
-                    {"name": "Q-Learning", "type": "Value-based", "model_free": True, "exploration": "epsilon-greedy"},
-                    {"name": "Policy Gradient", "type": "Policy-based", "model_free": True, "gradient_based": True},
-                    {"name": "Actor-Critic", "type": "Hybrid", "components": ["Actor", "Critic"], "advantage": "Reduced variance"},
-                    {"name": "DQN", "type": "Deep Q-Learning", "innovation": "Deep neural networks", "stability": "Experience replay"},
-                    {"name": "PPO", "type": "Policy-based", "algorithm": "Trust region", "stability": "Clipped objective"}
-                ],
-                "description": "Methods for learning through interaction with environment"
-            },
-            "machine learning models": {
-                "items": [
-                    {"name": "Linear Regression", "type": "regression", "complexity": "Low", "interpretability": "High"},
-                    {"name": "Logistic Regression", "type": "classification", "probabilistic": True, "use_case": "Binary/multiclass"},
-                    {"name": "SVM", "type": "classification", "kernel_trick": True, "high_dimensions": True},
-                    {"name": "Decision Trees", "type": "tree-based", "interpretability": "High", "risk": "Overfitting"},
-                    {"name": "Random Forest", "type": "ensemble", "robustness": "High", "parallel_friendly": True},
-                    {"name": "K-Means", "type": "clustering", "unsupervised": True, "complexity": "O(nkt)"}
-                ],
-                "description": "Fundamental machine learning algorithms and models"
-            },
-            "transformers": {
-                "items": [
-                    {"name": "BERT", "task": "Encoder", "training": "Masked Language Model", "applications": ["Classification", "NER", "QA"]},
-                    {"name": "GPT", "task": "Decoder", "training": "Causal Language Model", "applications": ["Text generation", "Summarization"]},
-                    {"name": "T5", "task": "Encoder-Decoder", "training": "Text-to-Text", "applications": ["All NLP tasks"]},
-                    {"name": "RoBERTa", "task": "Encoder", "improvement_over": "BERT", "training": "Optimized MLM"},
-                    {"name": "ELECTRA", "task": "Encoder", "training": "Discriminative", "efficiency": "Pre-training efficient"}
-                ],
-                "description": "State-of-the-art transformer models for NLP"
-            }
-        }
+        # next() on a count is atomic, so shared instances hand out unique ids across threads
+        self._research_ids = itertools.count(1)
+        # Built once; lookups cost O(topic tokens) however large the knowledge base grows
+        self.index = KnowledgeIndex(self.knowledge_base, KEYWORD_TO_CATEGORY)
+
+    def _initialize_knowledge_base(self, knowledge_base=None):
+        # A path loads that file; nothing loads the bundled KB. Loaded KBs are shared
+        # process-wide, so every agent reads the same immutable categories
+        if knowledge_base is None or isinstance(knowledge_base, (str, os.PathLike)):
+            return load_knowledge_base(knowledge_base or DEFAULT_KB_PATH)
+        return knowledge_base
 
     def research(self, topic: str) -> dict:
-        self.research_count += 1
-        
-        # Handle multi-topic queries (e.g., "transformer reinforcement")
+        # Every item research_iter() ranks for the topic, so both APIs merge sub-topics alike
+        return self.research_iter(topic).to_result()
+
+    async def research_async(self, topic: str) -> dict:
+        return await run_blocking(self.research, topic)
+
+    def research_iter(self, topic: str, limit: int = None, offset: int = 0) -> "ResearchCursor":
+        """
+        Cursor over the research results for topic, most relevant first, that loads
+        only the items it yields. Sub-topics are split on spaces; items matched by several
+        sub-topics rank first, specific-item matches before whole categories, then
+        declaration order. items_found is the full match count, known up front.
+        """
+        self.research_count = research_id = next(self._research_ids)
         topics = topic.split() if " " in topic else [topic]
-        
-        if len(topics) > 1:
-            # Research multiple topics and combine results
-            all_results = []
-            all_categories = []
-            for single_topic in topics:
-                result = self._research_single_topic(single_topic)
-                all_results.extend(result.get("result", []))
-                if result.get("matched_category"):
-                    all_categories.append(result.get("matched_category"))
-            
-            return {
-                "result": all_results,
-                "topics": topics,
-                "matched_categories": list(set(all_categories)),
-                "research_id": self.research_count,
-                "completeness": "high" if all_results else "low",
-                "items_found": len(all_results),
-                "query_type": "multi-topic"
-            }
+        # Sub-topic lookups are index probes of a few microseconds, so they run inline;
+        # a repeated sub-topic is looked up (and counted) once
+        lookups = []
+        timings_ms = {}
+        for sub_topic in dict.fromkeys(topics):
+            start = time.perf_counter()
+            lookups.append(self._lookup(sub_topic))
+            timings_ms[sub_topic] = round((time.perf_counter() - start) * 1000, 3)
+        categories = [category for category, _, _ in lookups if category]
+        if len(topics) == 1:
+            # Already in relevance order; a range stays lazy however big the category is
+            category, positions, query_type = lookups[0]
+            refs = [(category, position) for position in positions[offset:None if limit is None else offset + limit]]
+            items_found = len(positions)
         else:
-            return self._research_single_topic(topic)
-    
-    def _research_single_topic(self, topic: str) -> dict:
-        topic_lower = topic.lower()
-        result_items = []
-        matched_topic = None
-        keyword_to_category = {
-            "adam": "optimization techniques",
-            "sgd": "optimization techniques",
-            "gradient": "optimization techniques",
-            "descent": "optimization techniques",
-            "optimizer": "optimization techniques",
-            "optimization": "optimization techniques",  
-            "rmsprop": "optimization techniques",
-            "adagrad": "optimization techniques",
-            "nadam": "optimization techniques",
-            "neural": "neural networks",
-            "network": "neural networks",
-            "cnn": "neural networks",
-            "rnn": "neural networks",
-            "lstm": "neural networks",
-            "gru": "neural networks",
-            "transformer": "neural networks",
-            "dnn": "neural networks",
-            "convolutional": "neural networks",
-            "recurrent": "neural networks",
-            "reinforcement": "reinforcement learning",
-            "q-learning": "reinforcement learning",
-            "policy": "reinforcement learning",
-            "actor": "reinforcement learning",
-            "critic": "reinforcement learning",
-            "dqn": "reinforcement learning",
-            "ppo": "reinforcement learning",
-            "regression": "machine learning models",
-            "classification": "machine learning models",
-            "svm": "machine learning models",
-            "decision": "machine learning models",
-            "tree": "machine learning models",
-            "forest": "machine learning models",
-            "k-means": "machine learning models",
-            "clustering": "machine learning models",
-            "bert": "transformers",
-            "gpt": "transformers",
-            "t5": "transformers",
-            "roberta": "transformers",
-            "electra": "transformers",
-            "attention": "transformers",
-            "deep": "neural networks",
-            "learning": "reinforcement learning"
-        }
-        
-        #try exact category matching
-        for key, content in self.knowledge_base.items():
-            if key in topic_lower:
-                result_items = content["items"]
-                matched_topic = key
-                return {
-                    "result": result_items,
-                    "topic": topic,
-                    "matched_category": matched_topic,
-                    "research_id": self.research_count,
-                    "completeness": "high",
-                    "items_found": len(result_items)
-                }
-        #try keyword-based matching for more specific queries
-        best_match_score = 0
-        best_match_category = None
-        specific_item = None
-        
-        for keyword, category in keyword_to_category.items():
-            if keyword in topic_lower:
-                score = len(keyword)  #Longer keywords= more specific
-                if score > best_match_score:
-                    best_match_score = score
-                    best_match_category = category
-                    specific_item = keyword
-        
-        # If found a matching category via keywords
-        if best_match_category and best_match_category in self.knowledge_base:
-            content = self.knowledge_base[best_match_category]
-            all_items = content["items"]
-            
-            # filter to a specific item
-            if specific_item and best_match_score >= 3: 
-                filtered = [item for item in all_items 
-                           if isinstance(item, dict) and specific_item.lower() in item.get("name", "").lower()]
-                if filtered:
-                    result_items = filtered
-                else:
-                    result_items = all_items 
+            scores = {}
+            for category, positions, query_type in lookups:
+                weight = 2 if query_type == "specific" else 1
+                for position in positions:
+                    score = scores.setdefault((category, position), [0, len(scores)])
+                    score[0] += weight
+            rank = lambda ref: (-scores[ref][0], scores[ref][1])
+            if limit is None:
+                refs = sorted(scores, key=rank)[offset:]
             else:
-                result_items = all_items
-            
-            matched_topic = best_match_category
-            return {
-                "result": result_items,
-                "topic": topic,
-                "matched_category": matched_topic,
-                "research_id": self.research_count,
-                "completeness": "high",
-                "items_found": len(result_items),
-                "query_type": "specific" if len(result_items) < 6 else "category"
-            }
+                refs = heapq.nsmallest(offset + limit, scores, key=rank)[offset:]
+            items_found = len(scores)
+            query_type = "multi-topic"
+        return ResearchCursor(self, topic, topics, list(dict.fromkeys(categories)), research_id,
+                              items_found, query_type, refs, offset, limit, timings_ms)
+
+    def _lookup(self, topic: str):
+        # (matched category, item positions, query type) for one topic, without loading items
+        key = self.index.match_category(topic)
+        if key:
+            return key, range(self._category_size(key)), None
+        best_keyword = self.index.best_keyword(topic)
+        if best_keyword and best_keyword[1] in self.knowledge_base:
+            specific_item, category = best_keyword
+            positions = self.index.positions_matching(category, specific_item) if len(specific_item) >= 3 else []
+            positions = positions or range(self._category_size(category))
+            return category, positions, "specific" if len(positions) < 6 else "category"
+        return None, [], "none"
+
+    def _category_size(self, category: str) -> int:
+        item_count = getattr(self.knowledge_base, "item_count", None)
+        return item_count(category) if item_count else len(self.knowledge_base[category]["items"])
+
+    @staticmethod
+    def _no_match(topic: str, research_id: int) -> dict:
         return {
-            "result": ["No specific match found. Try queries like: 'What is CNN?', 'Compare Adam and SGD', 'Explain Transformers', 'What is LSTM?'"],
+            "result": [NO_MATCH_HINT],
             "topic": topic,
             "matched_category": None,
-            "research_id": self.research_count,
+            "research_id": research_id,
             "completeness": "low",
             "items_found": 0,
             "query_type": "none"
         }
+
+
+class ResearchCursor:
+    """
+    One page of research results (see ResearchAgent.research_iter). Iterating yields
+    the page's items, loading their categories on first use; categories not yet read
+    from a file-backed knowledge base are loaded concurrently. to_result() gives the
+    research() dict for the page plus paging fields.
+    """
+
+    def __init__(self, agent: ResearchAgent, topic: str, topics: List[str], matched_categories: List[str],
+                 research_id: int, items_found: int, query_type: str, refs, offset: int, limit: int,
+                 timings_ms: Dict[str, float] = None):
+        self._agent = agent
+        self._refs = refs
+        self.topic = topic
+        self.topics = topics
+        self.matched_categories = matched_categories
+        self.research_id = research_id
+        self.items_found = items_found
+        self.query_type = query_type
+        self.offset = offset
+        self.limit = limit
+        self.timings_ms = timings_ms or {}
+
+    def __iter__(self) -> Iterator[Any]:
+        items = self._load_categories()
+        for category, position in self._refs:
+            yield items[category][position]
+
+    def _load_categories(self) -> Dict[str, Any]:
+        knowledge_base = self._agent.knowledge_base
+        categories = list(dict.fromkeys(category for category, _ in self._refs))
+        materialized = getattr(knowledge_base, "materialized", None)
+        pending = [category for category in categories if materialized and not materialized(category)]
+        if len(pending) > 1:
+            # Each is a separate read and decode; overlap them instead of paying them in turn
+            list(CATEGORY_LOADER.map(knowledge_base.__getitem__, pending))
+        return {category: knowledge_base[category]["items"] for category in categories}
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    @property
+    def has_more(self) -> bool:
+        return self.offset + len(self._refs) < self.items_found
+
+    def to_result(self) -> dict:
+        if not self.items_found:
+            result = ResearchAgent._no_match(self.topic, self.research_id)
+        else:
+            result = {
+                "result": list(self),
+                "topic": self.topic,
+                "matched_category": self.matched_categories[0],
+                "research_id": self.research_id,
+                "completeness": "high",
+                "items_found": self.items_found,
+                "query_type": self.query_type or "category",
+            }
+        if len(self.topics) > 1:
+            result.update(topics=self.topics, matched_categories=self.matched_categories,
+                          timings_ms=self.timings_ms)
+        result.update(offset=self.offset, limit=self.limit, has_more=self.has_more)
+        return result
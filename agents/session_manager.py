@@ -0,0 +1,129 @@
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from agents.coordinator import Coordinator
+
+
+class Session:
+    """
+    Lightweight per-user conversation state.
+    - history is a ring buffer of the last max_history queries
+    - counters track queries per response source; the agents themselves are shared
+    """
+
+    __slots__ = ("session_id", "history", "query_count", "source_counts", "created", "last_active")
+
+    def __init__(self, session_id: str, max_history: int = 50):
+        self.session_id = session_id
+        self.history = deque(maxlen=max_history)
+        self.query_count = 0
+        self.source_counts = {}
+        self.created = time.time()
+        self.last_active = self.created
+
+    def record(self, result: Dict[str, Any]):
+        self.query_count += 1
+        source = result.get("source", "unknown")
+        self.source_counts[source] = self.source_counts.get(source, 0) + 1
+
+    def memory_bytes(self) -> int:
+        # Shallow footprint of the session object, its history and counters
+        size = sys.getsizeof(self) + sys.getsizeof(self.history) + sys.getsizeof(self.source_counts)
+        size += sum(sys.getsizeof(query) for query in self.history)
+        size += sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in self.source_counts.items())
+        return size
+
+
+class SessionManager:
+    """
+    Many concurrent sessions on top of one shared Coordinator.
+    - Sessions are kept in least-recently-active order, so idle eviction and the
+      max_sessions cap only ever look at the oldest entries
+    - Idle sessions are dropped after idle_timeout seconds of inactivity
+    """
+
+    def __init__(self, coordinator: Coordinator = None, max_history: int = 50,
+                 idle_timeout: float = 1800.0, max_sessions: int = 10000):
+        self.coordinator = coordinator or Coordinator()
+        self.max_history = max_history
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.evicted = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: Optional[str] = None) -> Session:
+        # Fetch (or create) a session and mark it active
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = Session(session_id or uuid.uuid4().hex, self.max_history)
+                self._sessions[session.session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._sessions.move_to_end(session.session_id)
+            session.last_active = now
+            return session
+
+    def handle_query(self, session_id: str, query: str) -> Dict[str, Any]:
+        session = self.get(session_id)
+        result = self.coordinator.handle_query(query, session=session)
+        session.record(result)
+        return result
+
+    def end_session(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            return self._evict_idle(time.time())
+
+    def _evict_idle(self, now: float) -> int:
+        evicted = 0
+        cutoff = now - self.idle_timeout
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_active >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def memory_report(self) -> Dict[str, Any]:
+        # Per-session footprint; the shared agents are counted once, not per session
+        with self._lock:
+            sessions: List[Session] = list(self._sessions.values())
+        per_session = {
+            session.session_id: {
+                "bytes": session.memory_bytes(),
+                "history": len(session.history),
+                "queries": session.query_count,
+                "sources": dict(session.source_counts),
+                "idle_seconds": time.time() - session.last_active,
+            }
+            for session in sessions
+        }
+        total = sum(info["bytes"] for info in per_session.values())
+        return {
+            "sessions": len(per_session),
+            "total_bytes": total,
+            "avg_bytes": total / len(per_session) if per_session else 0,
+            "evicted": self.evicted,
+            "per_session": per_session,
+        }
@@ -0,0 +1,123 @@
+import glob
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from agents.locking import FileLock
+from agents.vector_index import normalize_rows, search_many_dense, top_k
+
+
+class VectorFile:
+    """
+    Fixed-width float32 vector file shared between processes through np.memmap.
+    - <prefix>.f32 holds normalized rows, <prefix>.keys the int64 (memory id, commit seq)
+      of each row
+    - Appends write the vector rows first and the keys second, under an exclusive file
+      lock; readers size their mapping from the keys file, so they never see a torn row
+    - Readers never take the lock and map the files read-only (zero-copy, shared page cache)
+    """
+
+    def __init__(self, prefix: str, dim: int):
+        self.prefix = prefix
+        self.dim = dim
+        self.vectors_path = prefix + ".f32"
+        self.keys_path = prefix + ".keys"
+        self.lock = FileLock(prefix + ".lock")
+        for path in (self.vectors_path, self.keys_path):
+            open(path, "ab").close()
+        self._rows = 0
+        self._view = (np.zeros((0, dim), dtype=np.float32), np.zeros((0, 2), dtype=np.int64))
+
+    def __len__(self) -> int:
+        try:
+            return os.path.getsize(self.keys_path) // 16
+        except OSError:
+            # Removed by a clear/compaction in another process; keep the current mapping
+            return self._rows
+
+    @property
+    def max_seq(self) -> int:
+        keys = self._mapped()[1]
+        return int(keys[-1, 1]) if len(keys) else 0
+
+    def _mapped(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Remap only when another append has landed since the last call
+        rows = len(self)
+        if rows != self._rows:
+            if rows:
+                matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+                keys = np.memmap(self.keys_path, dtype=np.int64, mode="r", shape=(rows, 2))
+                self._view = (matrix, keys)
+            self._rows = rows
+        return self._view
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray]:
+        # (vectors, memory ids) of every committed row
+        matrix, keys = self._mapped()
+        return matrix, keys[:, 0]
+
+    def exists(self) -> bool:
+        # False once a clear/compaction in another process removed this generation
+        return os.path.exists(self.vectors_path) and os.path.exists(self.keys_path)
+
+    def write_rows(self, ids: np.ndarray, seqs: np.ndarray, vectors: np.ndarray, fsync: bool = False):
+        # Caller holds self.lock. Writes at the committed row count so a crashed
+        # partial append is overwritten. Raises FileNotFoundError (never recreates
+        # the files) if this generation has been removed meanwhile.
+        rows = len(self)
+        keys = np.column_stack([ids, seqs]).astype(np.int64)
+        for path, offset, payload in ((self.vectors_path, rows * self.dim * 4, vectors),
+                                      (self.keys_path, rows * 16, keys)):
+            with open(path, "r+b") as f:
+                f.seek(offset)
+                f.write(np.ascontiguousarray(payload).tobytes())
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def remove(self):
+        # Safe while other processes still map the files: their mappings stay valid
+        for path in (self.vectors_path, self.keys_path, self.lock.path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def remove_generations(root: str, keep: int):
+        # Only older generations: another process may already be on a newer one
+        for path in glob.glob(f"{glob.escape(root)}.*.g*.*"):
+            generation = path.rsplit(".g", 1)[-1].split(".", 1)[0]
+            if generation.isdigit() and int(generation) < keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class MappedVectorIndex:
+    """Exact cosine search that reads vectors straight from a VectorFile mapping."""
+
+    def __init__(self, vector_file: VectorFile):
+        self.vector_file = vector_file
+
+    def __len__(self) -> int:
+        return len(self.vector_file)
+
+    def reset(self):
+        pass
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.vector_file.view()
+
+    def search(self, query: np.ndarray, k: int = 1) -> List[Tuple[int, float]]:
+        matrix, ids = self.vector_file.view()
+        if not len(ids):
+            return []
+        scores = matrix @ normalize_rows(query)[0]
+        return top_k(scores, ids, k)
+
+    def search_many(self, queries: np.ndarray, k: int = 1) -> List[List[Tuple[int, float]]]:
+        matrix, ids = self.vector_file.view()
+        return search_many_dense(matrix, ids, queries, k)
@@ -0,0 +1,449 @@
+import os
+import threading
+import time
+from typing import List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# Vectors are assigned to IVF lists in blocks of about this many (row, centroid) scores
+ASSIGN_BLOCK_CELLS = 1 << 22
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    # L2-normalize each row as float32; all-zero rows stay zero
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class DenseVectorIndex:
+    """
+    Resident matrix of normalized float32 vectors for exact cosine search.
+    - Rows are stored contiguously and grown by doubling, so appends are amortized O(1)
+    - Norms are folded in at insert time; a search is one mat-vec product plus argpartition
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, ids, vectors: np.ndarray):
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        vectors = normalize_rows(vectors)
+        needed = self.size + len(ids)
+        if needed > len(self._ids):
+            capacity = max(needed, 2 * len(self._ids))
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            matrix[:self.size] = self._matrix[:self.size]
+            self._matrix = matrix
+            self._ids = np.resize(self._ids, capacity)
+        self._matrix[self.size:needed] = vectors
+        self._ids[self.size:needed] = ids
+        self.size = needed
+
+    def reset(self):
+        self.size = 0
+
+    def sort_by_id(self):
+        # Restore id order after filling from several sources (ties rank by insertion)
+        order = np.argsort(self._ids[:self.size], kind="stable")
+        self._matrix[:self.size] = self._matrix[:self.size][order]
+        self._ids[:self.size] = self._ids[:self.size][order]
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Views stay valid after later appends (growth allocates new buffers)
+        return self._matrix[:self.size], self._ids[:self.size]
+
+    def search(self, query: np.ndarray, k: int = 1) -> List[Tuple[int, float]]:
+        matrix, ids = self.snapshot()
+        if not len(ids):
+            return []
+        scores = matrix @ normalize_rows(query)[0]
+        return top_k(scores, ids, k)
+
+    def search_many(self, queries: np.ndarray, k: int = 1) -> List[List[Tuple[int, float]]]:
+        matrix, ids = self.snapshot()
+        return search_many_dense(matrix, ids, queries, k)
+
+
+class SparseVectorIndex:
+    """
+    Growable CSR matrix of normalized sparse vectors for exact cosine search.
+    - indptr/indices/data buffers grow by doubling, so appends are amortized O(1)
+    - A column-major (CSC) copy of the older rows lets a search touch only the
+      posting columns of the query's non-zero features; rows appended since the
+      last conversion are scored directly from the CSR tail
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._indptr = np.zeros(capacity + 1, dtype=np.int64)
+        self._indices = np.zeros(capacity * 32, dtype=np.int32)
+        self._data = np.zeros(capacity * 32, dtype=np.float32)
+        self.size = 0
+        self._csc = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, ids, vectors):
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        vectors = sparse.csr_matrix(vectors, dtype=np.float32)
+        nnz = self._indptr[self.size]
+        needed_rows = self.size + len(ids)
+        needed_nnz = nnz + vectors.nnz
+        if needed_rows > len(self._ids):
+            capacity = max(needed_rows, 2 * len(self._ids))
+            self._ids = np.resize(self._ids, capacity)
+            self._indptr = np.resize(self._indptr, capacity + 1)
+        if needed_nnz > len(self._data):
+            capacity = max(needed_nnz, 2 * len(self._data))
+            self._indices = np.resize(self._indices, capacity)
+            self._data = np.resize(self._data, capacity)
+        self._indices[nnz:needed_nnz] = vectors.indices
+        self._data[nnz:needed_nnz] = vectors.data
+        self._indptr[self.size + 1:needed_rows + 1] = nnz + vectors.indptr[1:]
+        self._ids[self.size:needed_rows] = ids
+        self.size = needed_rows
+
+    def reset(self):
+        self.size = 0
+        self._csc = None
+
+    def snapshot(self) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        nnz = self._indptr[self.size]
+        matrix = sparse.csr_matrix(
+            (self._data[:nnz], self._indices[:nnz], self._indptr[:self.size + 1]),
+            shape=(self.size, self.dim), copy=False,
+        )
+        return matrix, self._ids[:self.size]
+
+    def _column_view(self, matrix: sparse.csr_matrix) -> sparse.csc_matrix:
+        # Rebuild the CSC copy once the unconverted tail grows past 1/8 of the index
+        csc = self._csc
+        tail = matrix.shape[0] - (csc.shape[0] if csc is not None else 0)
+        if csc is None or tail < 0 or tail > max(1024, matrix.shape[0] // 8):
+            csc = matrix.tocsc()
+            self._csc = csc
+        return csc
+
+    def search(self, query, k: int = 1) -> List[Tuple[int, float]]:
+        matrix, ids = self.snapshot()
+        if not len(ids):
+            return []
+        query = sparse.csr_matrix(query, dtype=np.float32)
+        csc = self._column_view(matrix)
+        scores = np.empty(len(ids), dtype=np.float32)
+        head = csc.shape[0]
+        scores[:head] = csc[:, query.indices] @ query.data
+        if head < len(ids):
+            scores[head:] = (matrix[head:] @ query.T).toarray().ravel()
+        return top_k(scores, ids, k)
+
+    def search_many(self, queries, k: int = 1) -> List[List[Tuple[int, float]]]:
+        # One sparse-sparse product for all queries; rows without a shared feature
+        # score zero and never enter the candidate set
+        matrix, ids = self.snapshot()
+        queries = sparse.csr_matrix(queries, dtype=np.float32)
+        if not len(ids):
+            return [[] for _ in range(queries.shape[0])]
+        csc = self._column_view(matrix)
+        head = csc.shape[0]
+        scores = csc @ queries.T
+        if head < len(ids):
+            scores = sparse.vstack([scores, matrix[head:] @ queries.T])
+        scores = sparse.csc_matrix(scores)
+        results = []
+        for j in range(queries.shape[0]):
+            start, end = scores.indptr[j], scores.indptr[j + 1]
+            rows = scores.indices[start:end]
+            order = np.argsort(rows, kind="stable")
+            results.append(top_k(scores.data[start:end][order], ids[rows[order]], k))
+        return results
+
+
+def search_many_dense(matrix: np.ndarray, ids: np.ndarray, queries: np.ndarray,
+                      k: int) -> List[List[Tuple[int, float]]]:
+    # Score all queries with matrix-matrix products, chunked so the score block
+    # stays around 64 MB however large the index grows
+    queries = normalize_rows(queries)
+    if not len(ids):
+        return [[] for _ in range(len(queries))]
+    step = max(1, (1 << 24) // len(ids))
+    results = []
+    for start in range(0, len(queries), step):
+        scores = queries[start:start + step] @ matrix.T
+        results.extend(top_k(row, ids, k) for row in scores)
+    return results
+
+
+def top_k(scores: np.ndarray, ids: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    # Highest scores first; ties keep insertion order like a linear scan would
+    if k <= 0 or not len(scores):
+        return []
+    if k == 1:
+        best = int(np.argmax(scores))
+        return [(int(ids[best]), float(scores[best]))]
+    if k < len(scores):
+        candidates = np.sort(np.argpartition(-scores, k - 1)[:k])
+    else:
+        candidates = np.arange(len(scores))
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [(int(ids[i]), float(scores[i])) for i in order]
+
+
+class IVFVectorIndex:
+    """
+    Inverted-file (IVF) approximate index over normalized vectors.
+    - KMeans centroids partition the vectors into n_lists inverted lists
+    - A search scans only the nprobe lists whose centroids best match the query;
+      nprobe is the recall/latency knob (nprobe == n_lists is an exact scan)
+    - New vectors go straight into their nearest list, scored a block at a time so
+      memory stays flat however many arrive at once
+    - Training starts once min_train_size vectors are in, and again each time the index
+      has grown by retrain_growth. It runs on a background thread that fills the new
+      lists aside and swaps them in, so adds and searches never wait on KMeans
+    - Centroids and list assignments persist to an .npz file
+    """
+
+    def __init__(self, dim: int, n_lists: int = 0, nprobe: int = 8,
+                 min_train_size: int = 4096, retrain_growth: float = 2.0,
+                 train_sample: int = 100000, path: str = None):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.train_sample = train_sample
+        self.path = path
+        self.trained_size = 0
+        self.retrain_count = 0
+        self._saved_assignments = None
+        # (centroids, lists) is replaced as a whole, so a search never pairs centroids
+        # with lists from another training
+        self._state = (None, [DenseVectorIndex(dim)])
+        self._lock = threading.Lock()
+        self._trainer = None
+        self._backlog = None
+        self._epoch = 0
+        if path:
+            self.load()
+
+    def __len__(self) -> int:
+        return sum(len(lst) for lst in self._state[1])
+
+    @property
+    def centroids(self) -> np.ndarray:
+        return self._state[0]
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def reset(self):
+        # Drop the vectors but keep the trained quantizer; a training in flight is discarded
+        with self._lock:
+            centroids, lists = self._state
+            self._state = (centroids, [DenseVectorIndex(self.dim) for _ in lists])
+            self._epoch += 1
+
+    def add(self, ids, vectors: np.ndarray):
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        vectors = normalize_rows(vectors)
+        with self._lock:
+            centroids, lists = self._state
+            if centroids is None:
+                lists[0].add(ids, vectors)
+            else:
+                self._fill(lists, centroids, ids, vectors, self._saved_assignments)
+            if self._backlog is not None:
+                self._backlog.append((ids, vectors))
+            due = self.min_train_size if centroids is None else self.retrain_growth * self.trained_size
+            if self._trainer is None and len(self) >= due:
+                self._start_training()
+
+    def _fill(self, lists: List[DenseVectorIndex], centroids: np.ndarray, ids: np.ndarray,
+              vectors: np.ndarray, saved=None):
+        # Add normalized vectors to their nearest lists, a block at a time so the
+        # rows x n_lists score block stays around ASSIGN_BLOCK_CELLS
+        step = max(1, ASSIGN_BLOCK_CELLS // len(centroids))
+        for start in range(0, len(ids), step):
+            block_ids = ids[start:start + step]
+            block = vectors[start:start + step]
+            assignments = np.argmax(block @ centroids.T, axis=1)
+            if saved is not None:
+                # Reuse persisted assignments instead of recomputing them on load
+                saved_ids, saved_lists = saved
+                pos = np.searchsorted(saved_ids, block_ids)
+                pos[pos == len(saved_ids)] = 0
+                known = saved_ids[pos] == block_ids if len(saved_ids) else np.zeros(len(block_ids), bool)
+                assignments[known] = saved_lists[pos[known]]
+            order = np.argsort(assignments, kind="stable")
+            list_nos, starts = np.unique(assignments[order], return_index=True)
+            for list_no, first, last in zip(list_nos, starts, list(starts[1:]) + [len(order)]):
+                rows = order[first:last]
+                lists[list_no].add(block_ids[rows], block[rows])
+
+    def _all_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        parts = [lst.snapshot() for lst in self._state[1] if len(lst)]
+        if not parts:
+            return np.zeros((0, self.dim), np.float32), np.zeros(0, np.int64)
+        matrix = np.concatenate([m for m, _ in parts])
+        ids = np.concatenate([i for _, i in parts])
+        order = np.argsort(ids, kind="stable")
+        return matrix[order], ids[order]
+
+    def train(self):
+        # Train now and wait for the new lists to be in place
+        with self._lock:
+            if self._trainer is None:
+                self._start_training()
+            trainer = self._trainer
+        trainer.join()
+
+    def wait_for_training(self, timeout: float = None):
+        trainer = self._trainer
+        if trainer is not None:
+            trainer.join(timeout)
+
+    def _start_training(self):
+        # Caller holds self._lock. Snapshot views stay valid while the lists keep growing;
+        # vectors added from here on are also kept in the backlog for the new lists
+        parts = [lst.snapshot() for lst in self._state[1] if len(lst)]
+        self._backlog = []
+        self._trainer = threading.Thread(target=self._retrain, args=(parts, self._epoch),
+                                         name="ivf-trainer", daemon=True)
+        self._trainer.start()
+
+    def _retrain(self, parts, epoch: int):
+        try:
+            total = sum(len(ids) for _, ids in parts)
+            if not total:
+                return
+            centroids = self._fit(parts, total)
+            lists = [DenseVectorIndex(self.dim, capacity=16) for _ in range(len(centroids))]
+            for matrix, ids in parts:
+                self._fill(lists, centroids, ids, matrix)
+            for lst in lists:
+                lst.sort_by_id()
+            with self._lock:
+                if epoch != self._epoch:
+                    return
+                # Only the vectors added during training are assigned under the lock
+                for ids, vectors in self._backlog:
+                    self._fill(lists, centroids, ids, vectors)
+                self._state = (centroids, lists)
+                self._saved_assignments = None
+                self.trained_size = sum(len(lst) for lst in lists)
+                self.retrain_count += 1
+            self.save()
+        finally:
+            with self._lock:
+                self._trainer = None
+                self._backlog = None
+
+    def _fit(self, parts, total: int) -> np.ndarray:
+        from sklearn.cluster import KMeans
+
+        n_lists = self.n_lists or max(1, int(np.sqrt(total)))
+        n_lists = min(n_lists, total)
+        # ~64 points per centroid is plenty to place them
+        sample_size = min(self.train_sample, 64 * n_lists, total)
+        positions = np.sort(np.random.default_rng(0).choice(total, sample_size, replace=False))
+        bounds = np.cumsum([0] + [len(ids) for _, ids in parts])
+        sample = np.concatenate([matrix[positions[(positions >= lo) & (positions < hi)] - lo]
+                                 for (matrix, _), lo, hi in zip(parts, bounds[:-1], bounds[1:])])
+        kmeans = KMeans(n_clusters=n_lists, n_init=1, max_iter=25, random_state=0).fit(sample)
+        return normalize_rows(kmeans.cluster_centers_)
+
+    def search(self, query: np.ndarray, k: int = 1, nprobe: int = None) -> List[Tuple[int, float]]:
+        query = normalize_rows(query)[0]
+        centroids, lists = self._state
+        if centroids is None:
+            return lists[0].search(query, k)
+        nprobe = min(nprobe or self.nprobe, len(lists))
+        probe = top_k(centroids @ query, np.arange(len(lists)), nprobe)
+        candidates = []
+        for list_no, _ in probe:
+            candidates.extend(lists[list_no].search(query, k))
+        candidates.sort(key=lambda hit: (-hit[1], hit[0]))
+        return candidates[:k]
+
+    def search_many(self, queries: np.ndarray, k: int = 1) -> List[List[Tuple[int, float]]]:
+        # Each query probes its own lists
+        return [self.search(query[None, :], k) for query in normalize_rows(queries)]
+
+    def save(self):
+        centroids, lists = self._state
+        if not self.path or centroids is None:
+            return
+        ids_per_list = [lst.snapshot()[1] for lst in lists]
+        ids = np.concatenate(ids_per_list) if ids_per_list else np.zeros(0, np.int64)
+        list_nos = np.repeat(np.arange(len(ids_per_list)), [len(i) for i in ids_per_list])
+        order = np.argsort(ids)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp_path, centroids=centroids, trained_size=self.trained_size,
+                 ids=ids[order], lists=list_nos[order])
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with np.load(self.path) as data:
+            if data["centroids"].shape[1] != self.dim:
+                return
+            centroids = data["centroids"]
+            self.trained_size = int(data["trained_size"])
+            self._saved_assignments = (data["ids"], data["lists"])
+        self._state = (centroids, [DenseVectorIndex(self.dim, capacity=16) for _ in range(len(centroids))])
+
+
+def recall_report(index: IVFVectorIndex, queries: np.ndarray, k: int = 1,
+                  nprobe_values=(1, 2, 4, 8, 16, 32), threshold: float = 0.85) -> List[dict]:
+    """
+    Compare IVF search against an exact scan for each nprobe setting.
+    Reports recall@k, how often the threshold decision (top score >= threshold)
+    agrees with the exact one, and mean latency of both paths.
+    """
+    queries = normalize_rows(queries)
+    matrix, ids = index._all_vectors()
+    exact_hits, exact_time = [], 0.0
+    for query in queries:
+        start = time.perf_counter()
+        exact_hits.append(top_k(matrix @ query, ids, k))
+        exact_time += time.perf_counter() - start
+
+    report = []
+    for nprobe in nprobe_values:
+        found, agree, ann_time = 0, 0, 0.0
+        for query, exact in zip(queries, exact_hits):
+            start = time.perf_counter()
+            approx = index.search(query, k, nprobe=nprobe)
+            ann_time += time.perf_counter() - start
+            found += len({i for i, _ in exact} & {i for i, _ in approx})
+            exact_pass = bool(exact) and exact[0][1] >= threshold
+            approx_pass = bool(approx) and approx[0][1] >= threshold
+            agree += exact_pass == approx_pass
+        total = max(1, sum(len(hits) for hits in exact_hits))
+        report.append({
+            "nprobe": nprobe,
+            "recall_at_k": found / total,
+            "threshold_agreement": agree / max(1, len(queries)),
+            "ann_ms": 1000 * ann_time / max(1, len(queries)),
+            "exact_ms": 1000 * exact_time / max(1, len(queries)),
+        })
+    return report
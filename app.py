@@ -1,22 +1,32 @@
 import streamlit as st
-from agents.coordinator import Coordinator
+from agents.agent_pool import get_pool
+from agents.analysis_result import AnalysisResult
 from datetime import datetime
 import json
 
-# Initialize coordinator agent
-coordinator = Coordinator()
+# Agents are built once per process and survive reruns; sessions sit on top
+pool = get_pool()
+session_manager = pool.session_manager()
+coordinator = session_manager.coordinator
 
 # Configure page layout and title
 st.set_page_config(page_title="Multi-Agent Chatbot", layout="wide")
+session = session_manager.get(st.session_state.get("session_id"))
+st.session_state.session_id = session.session_id
 st.title("Multi-Agent Research & Analysis Assistant")
 
 # Sidebar with system information and metrics
 with st.sidebar:
     st.header("System Information")
-    st.write(f"Total Queries: {len(coordinator.query_history)}")
+    st.write(f"Total Queries: {session.query_count}")
     if st.checkbox("Show Advanced Metrics"):
         st.write(f"Research Agent Calls: {coordinator.research_agent.research_count}")
         st.write(f"Analysis Agent Calls: {coordinator.analysis_agent.analysis_count}")
+        st.write(f"Analysis Cache Hit Rate: {coordinator.analysis_agent.analysis_cache.stats()['hit_rate']:.1%}")
+        st.write(f"Active Sessions: {len(session_manager)}")
+        for name, stats in pool.timing_report().items():
+            st.write(f"{name}: cold {stats['cold_seconds'] * 1000:.1f} ms, "
+                     f"warm {stats['warm_seconds'] * 1e6:.1f} µs ({stats['warm_hits']} reuses)")
 
 if "log" not in st.session_state:
     st.session_state.log = []
@@ -38,7 +48,7 @@ if st.session_state.log:
     for i, entry in enumerate(st.session_state.log):
         # Process pending responses by executing coordinator pipeline
         if entry.get("response") == "Processing...":
-            res = coordinator.handle_query(entry['query'])
+            res = session_manager.handle_query(session.session_id, entry['query'])
             entry["response"] = res
         
         with st.container():
@@ -98,7 +108,8 @@ if st.session_state.log:
                         analysis = resp["analysis"]
                         if analysis.get("status") == "success":
                             st.success(f"Analysis Complete")
-                            st.write(analysis["summary"])
+                            # Rendered once per result; reruns reuse the memoized markdown
+                            st.markdown(AnalysisResult.of(analysis).markdown())
                             st.write(f"**Confidence:** {analysis.get('confidence', 0):.1%}")
                             st.write(f"**Items Analyzed:** {analysis.get('items_analyzed', 0)}")
                         else:
@@ -111,7 +122,7 @@ col1, col2, col3 = st.columns(3)
 with col1:
     if st.button(" Clear History"):
         st.session_state.log = []
-        coordinator.query_history = []
+        session.history.clear()
         st.rerun()
 with col2:
     if st.button(" Export Results"):
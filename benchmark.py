@@ -0,0 +1,80 @@
+"""
+Throughput benchmark for the Coordinator's async and bulk APIs.
+Runs the same batch of distinct queries with 1, 10 and 100 queries in flight on one
+event loop, then through handle_queries with growing process pools, and reports
+queries/second next to the sequential sync API.
+
+    python benchmark.py [--queries 300] [--levels 1 10 100] [--workers 1 2 4]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from agents.coordinator import MEMORY_OPTIONS, Coordinator
+from agents.memory_agent import MemoryAgent
+
+TOPICS = ["adam optimizer", "neural networks", "lstm", "transformer", "reinforcement learning",
+          "sgd", "cnn", "clustering", "bert", "gradient descent"]
+TEMPLATES = ["Research {} ({})", "Compare {} vs sgd ({})", "Explain {} and summarize ({})"]
+
+
+def make_queries(count: int):
+    # Distinct queries so neither the query cache nor memory short-circuits the pipeline
+    return [TEMPLATES[i % len(TEMPLATES)].format(TOPICS[i % len(TOPICS)], i) for i in range(count)]
+
+
+def fresh_coordinator(directory: str, name: str) -> Coordinator:
+    memory = MemoryAgent(str(Path(directory) / f"{name}.db"), **MEMORY_OPTIONS)
+    return Coordinator(memory_agent=memory)
+
+
+async def run_concurrent(coordinator: Coordinator, queries, concurrency: int) -> float:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(query):
+        async with limit:
+            await coordinator.handle_query_async(query)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    await coordinator.drain()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    queries = make_queries(args.queries)
+
+    with tempfile.TemporaryDirectory() as directory:
+        coordinator = fresh_coordinator(directory, "sync")
+        start = time.perf_counter()
+        for query in queries:
+            coordinator.handle_query(query)
+        elapsed = time.perf_counter() - start
+        coordinator.memory_agent.close()
+        print(f"{'sync sequential':>18}: {len(queries) / elapsed:8.1f} q/s  ({elapsed * 1000:.0f} ms)")
+
+        for level in args.levels:
+            coordinator = fresh_coordinator(directory, f"async{level}")
+            elapsed = asyncio.run(run_concurrent(coordinator, queries, level))
+            coordinator.memory_agent.close()
+            print(f"{f'async x{level}':>18}: {len(queries) / elapsed:8.1f} q/s  ({elapsed * 1000:.0f} ms)")
+
+        for workers in args.workers:
+            coordinator = fresh_coordinator(directory, f"bulk{workers}")
+            start = time.perf_counter()
+            coordinator.handle_queries(queries, workers=workers, processes=True)
+            elapsed = time.perf_counter() - start
+            coordinator.memory_agent.close()
+            print(f"{f'bulk {workers} procs':>18}: {len(queries) / elapsed:8.1f} q/s  ({elapsed * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from agents.analysis_result import AnalysisResult
 from agents.coordinator import Coordinator
 import sys
 import io
@@ -33,7 +34,7 @@ def main():
         if 'analysis' in response:
             analysis = response['analysis']
             print(f"\nAnalysis - Status: {analysis['status']}, Confidence: {analysis['confidence']:.0%}")
-            summary = analysis['summary'].replace('█', '=').replace('░', '-')[:200]
+            summary = AnalysisResult.of(analysis).text().replace('█', '=').replace('░', '-')[:200]
             print(f"  {summary}...")
 
 if __name__ == "__main__":
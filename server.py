@@ -0,0 +1,308 @@
+"""
+Headless HTTP/JSON entry point for the Coordinator.
+
+    POST /query   {"query": "...", "session_id": "optional"}  -> handle_query result
+                  (without a session_id the query gets no conversation context)
+    GET  /health  -> {"status": "ok", ...}
+
+Connections are accepted on one thread and handed to a fixed pool of workers through
+a bounded queue; when the queue is full the connection is answered with 503 right away
+so a proxy can retry another replica. A worker serves one request and lets go of the
+connection: HTTP/1.1 keep-alive connections wait in a selector between requests, so
+idle clients hold no worker, and are closed after --idle-timeout idle seconds.
+
+    python server.py [--host 127.0.0.1] [--port 8080] [--workers 8] [--queue-size 64]
+"""
+
+import argparse
+import json
+import queue
+import selectors
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from agents.agent_pool import get_pool
+from agents.session_manager import Session
+
+_OVERLOAD_BODY = b'{"error": "server overloaded"}'
+# Written straight to the socket when the queue is full, without parsing the request
+OVERLOADED = (b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json\r\n"
+              b"Content-Length: %d\r\nRetry-After: 1\r\nConnection: close\r\n\r\n"
+              % len(_OVERLOAD_BODY)) + _OVERLOAD_BODY
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "KRRAgents/1.0"
+
+    @classmethod
+    def attach(cls, request, client_address, server) -> "QueryHandler":
+        # Set up a connection without serving it (BaseRequestHandler.__init__ would serve
+        # it to the end); the server then dispatches it one request at a time
+        handler = cls.__new__(cls)
+        handler.request, handler.client_address, handler.server = request, client_address, server
+        handler.setup()
+        return handler
+
+    def setup(self):
+        super().setup()
+        # A client that stalls mid-request gives its worker back after this long
+        self.connection.settimeout(self.server.idle_timeout)
+
+    def handle_next(self) -> bool:
+        # Serve one request; True when the connection stays open for another
+        self.close_connection = True
+        self.handle_one_request()
+        return not self.close_connection
+
+    def has_buffered_request(self) -> bool:
+        # A pipelined request may already sit in rfile's buffer, where no selector sees it
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.server.idle_timeout)
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._send_json(404, {"error": "not found"})
+        self._send_json(200, self.server.health())
+
+    def do_POST(self):
+        if self.path != "/query":
+            return self._send_json(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length < 0:
+                raise ValueError("negative Content-Length")
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            query = payload["query"]
+            if not isinstance(query, str) or not query.strip():
+                raise ValueError("query must be a non-empty string")
+        except (KeyError, ValueError, TypeError) as exc:
+            return self._send_json(400, {"error": f"bad request: {exc}"})
+        session_id = payload.get("session_id")
+        try:
+            if session_id:
+                result = self.server.session_manager.handle_query(str(session_id), query)
+            else:
+                # A throwaway session: no context from, or into, other clients' queries
+                result = self.server.session_manager.coordinator.handle_query(query, session=Session("anonymous"))
+        except Exception as exc:
+            return self._send_json(500, {"error": repr(exc)})
+        self._send_json(200, result)
+
+    def _send_json(self, status: int, body):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class QueryServer(HTTPServer):
+    """
+    HTTPServer with a bounded queue of ready connections in front of a fixed worker pool.
+    - Accepted connections, and kept-alive ones with a new request, are queued; a worker
+      serves one request, then hands the connection to the idle poller or closes it
+    - A full queue is answered with 503 immediately instead of piling up latency
+    """
+
+    allow_reuse_address = True
+
+    def __init__(self, address, session_manager, workers: int = 8, queue_size: int = 64,
+                 idle_timeout: float = 5.0, verbose: bool = False):
+        super().__init__(address, QueryHandler)
+        self.session_manager = session_manager
+        self.idle_timeout = idle_timeout
+        self.verbose = verbose
+        self.started = time.time()
+        self.rejected = 0
+        self.served = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._poller = _IdlePoller(self)
+        self._workers = [threading.Thread(target=self._work, name=f"http-worker-{n}", daemon=True)
+                         for n in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def process_request(self, request, client_address):
+        try:
+            handler = QueryHandler.attach(request, client_address, self)
+        except OSError:
+            self.shutdown_request(request)
+            return
+        self.dispatch(handler)
+
+    def dispatch(self, handler: QueryHandler):
+        # Queue a connection with a request to serve, or turn it away when the queue is full
+        try:
+            self._queue.put_nowait(handler)
+        except queue.Full:
+            self.rejected += 1
+            try:
+                handler.connection.sendall(OVERLOADED)
+            except OSError:
+                pass
+            self.close_connection(handler)
+
+    def close_connection(self, handler: QueryHandler):
+        try:
+            handler.finish()
+        except OSError:
+            pass
+        self.shutdown_request(handler.request)
+        self.served += 1
+
+    def _work(self):
+        while True:
+            handler = self._queue.get()
+            if handler is None:
+                return
+            try:
+                keep_alive = handler.handle_next()
+            except Exception:
+                self.handle_error(handler.request, handler.client_address)
+                keep_alive = False
+            if not keep_alive:
+                self.close_connection(handler)
+            elif handler.has_buffered_request():
+                self.dispatch(handler)
+            else:
+                self._poller.watch(handler)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime_seconds": time.time() - self.started,
+            "workers": len(self._workers),
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "idle_connections": self._poller.watching,
+            "connections_served": self.served,
+            "rejected": self.rejected,
+            "sessions": len(self.session_manager),
+        }
+
+    def server_close(self):
+        super().server_close()
+        self._poller.close()
+        for _ in self._workers:
+            self._queue.put(None)
+
+
+class _IdlePoller:
+    """
+    Kept-alive connections between requests, watched by one selector thread.
+    - A connection that turns readable (a new request, or the client closing) is
+      dispatched to the workers again
+    - One idle for idle_timeout seconds is closed
+    """
+
+    def __init__(self, server: QueryServer):
+        self.server = server
+        self.watching = 0
+        self._selector = selectors.DefaultSelector()
+        self._incoming = queue.SimpleQueue()
+        # Workers hand connections over through _incoming and wake the selector up
+        self._wakeup, self._waker = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._selector.register(self._wakeup, selectors.EVENT_READ)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="http-idle-poller", daemon=True)
+        self._thread.start()
+
+    def watch(self, handler: QueryHandler):
+        self._incoming.put(handler)
+        self._wake()
+
+    def close(self):
+        self._closed = True
+        self._wake()
+        self._thread.join()
+
+    def _wake(self):
+        try:
+            self._waker.send(b"\0")
+        except OSError:
+            pass
+
+    def _run(self):
+        deadlines = {}
+        while not self._closed:
+            while True:
+                try:
+                    handler = self._incoming.get_nowait()
+                except queue.Empty:
+                    break
+                self._selector.register(handler.connection, selectors.EVENT_READ, handler)
+                deadlines[handler] = time.monotonic() + self.server.idle_timeout
+            now = time.monotonic()
+            for handler in [handler for handler, deadline in deadlines.items() if deadline <= now]:
+                self._forget(handler, deadlines)
+                self.server.close_connection(handler)
+            self.watching = len(deadlines)
+            timeout = max(0.0, min(deadlines.values()) - now) if deadlines else None
+            for key, _ in self._selector.select(timeout):
+                if key.fileobj is self._wakeup:
+                    try:
+                        while self._wakeup.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                self._forget(key.data, deadlines)
+                self.server.dispatch(key.data)
+        for handler in list(deadlines):
+            self._forget(handler, deadlines)
+            self.server.close_connection(handler)
+        self._selector.close()
+        self._wakeup.close()
+        self._waker.close()
+
+    def _forget(self, handler: QueryHandler, deadlines):
+        self._selector.unregister(handler.connection)
+        del deadlines[handler]
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8080, workers: int = 8, queue_size: int = 64,
+                  idle_timeout: float = 5.0, session_manager=None, verbose: bool = False) -> QueryServer:
+    # port=0 binds a free port (see server.server_address); agents come from the process-wide pool
+    if session_manager is None:
+        session_manager = get_pool().session_manager()
+    return QueryServer((host, port), session_manager, workers=workers, queue_size=queue_size,
+                       idle_timeout=idle_timeout, verbose=verbose)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON query service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--idle-timeout", type=float, default=5.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    server = create_server(args.host, args.port, args.workers, args.queue_size,
+                           args.idle_timeout, verbose=args.verbose)
+    print(f"Serving on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.session_manager.coordinator.memory_agent.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Unit tests for the process-wide shared agent pool
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.agent_pool import AgentPool
+from agents.research_agent import ResearchAgent
+
+
+def test_resources_are_built_once_and_shared(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pool = AgentPool()
+    builds = []
+
+    def factory():
+        builds.append(1)
+        return object()
+
+    with ThreadPoolExecutor(8) as executor:
+        resources = list(executor.map(lambda _: pool.get("thing", factory), range(32)))
+    assert len(builds) == 1 and len({id(r) for r in resources}) == 1
+    assert pool.timing_report()["thing"]["warm_hits"] == 31
+
+    manager = pool.session_manager()
+    assert pool.session_manager() is manager
+    assert manager.coordinator.research_agent is pool.research_agent()
+    assert manager.coordinator.memory_agent is pool.memory_agent()
+    assert pool.timing_report()["coordinator"]["cold_seconds"] > 0
+    manager.coordinator.memory_agent.close()
+
+
+def test_shared_research_agent_hands_out_unique_ids():
+    agent = ResearchAgent()
+    with ThreadPoolExecutor(8) as executor:
+        ids = list(executor.map(lambda _: agent.research("adam")["research_id"], range(200)))
+    assert sorted(ids) == list(range(1, 201))
@@ -0,0 +1,137 @@
+"""
+Unit tests for AnalysisAgent domain detection and structured results
+"""
+
+import json
+import pickle
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.analysis_agent import AnalysisAgent
+from agents.analysis_result import AnalysisResult
+
+
+def test_items_are_grouped_by_domain_in_one_pass():
+    agent = AnalysisAgent()
+    data = [{"name": "Adam"}, {"name": "LSTM", "best_for": "Long sequences"}, "CNN", "compare GRU and Nadam", 42]
+    groups = agent._detect(agent._identities(data))
+    assert {domain: set(names) for domain, names in groups.items()} == {
+        "neural_networks": {"LSTM", "CNN", "GRU"}, "optimization": {"Adam", "Nadam"}}
+
+
+def test_field_values_do_not_trigger_other_domains():
+    agent = AnalysisAgent()
+    # RMSProp's use case mentions "RNNs", which used to pull in a neural network comparison
+    result = agent.analyze([{"name": "RMSProp", "use_case": "RNNs, non-stationary problems"}])
+    assert result["summary"].startswith("[OPTIMIZATION TECHNIQUE COMPARISON]")
+    assert "NEURAL NETWORK" not in result["summary"]
+    assert "**RMSProp**" in result["summary"]
+
+
+def test_new_domains_plug_in_without_code_changes():
+    agent = AnalysisAgent()
+    agent.add_metrics("clustering", {"K-Means": {"speed": 9, "scalability": 8},
+                                     "DBSCAN": {"speed": 6, "scalability": 5}})
+    result = agent.analyze([{"name": "DBSCAN"}])
+    assert result["analysis_type"] == "comparative"
+    assert result["summary"].startswith("[CLUSTERING COMPARISON]")
+    assert "**DBSCAN**" in result["summary"] and "K-Means" not in result["summary"]
+
+
+def test_registry_changes_go_through_add_metrics():
+    agent = AnalysisAgent()
+    adamw = {"convergence": 9, "speed": 8, "stability": 9, "memory": 6}
+    # Direct edits would leave the metric matrices and detection tables stale
+    with pytest.raises(TypeError):
+        agent.comparison_metrics["optimization"]["AdamW"] = adamw
+    with pytest.raises(TypeError):
+        agent.comparison_metrics["neural_networks"] = {}
+    with pytest.raises(TypeError):
+        agent.engines["optimization"] = None
+    assert agent.analyze([{"name": "AdamW"}])["analysis_type"] == "descriptive"
+
+    rows = {"AdamW": adamw}
+    agent.add_metrics("optimization", rows)
+    rows["AdamW"]["speed"] = 1
+    result = agent.analyze([{"name": "AdamW"}])
+    assert result["analysis_type"] == "comparative"
+    assert result["comparisons"][0]["items"][0]["scores"]["speed"] == 8
+    assert "AdamW" in agent.engines["optimization"]
+    assert agent.engines["optimization"].record("AdamW")["speed"] == 8
+
+
+def test_results_are_compact_and_render_lazily_once():
+    agent = AnalysisAgent()
+    result = agent.analyze([{"name": "Adam"}, {"name": "RMSProp"}])
+    assert "summary" not in result
+    assert result["comparisons"][0]["items"][0] == {
+        "name": "Adam", "scores": {"convergence": 9, "speed": 8, "stability": 9, "memory": 6},
+        "notes": {"best_for": "Deep learning (industry standard)"}}
+    text = result.text()
+    assert text.startswith("[OPTIMIZATION TECHNIQUE COMPARISON]") and "█████████░ (9/10)" in text
+    assert result.text() is text and result["summary"] is text
+    assert "| **Adam** | 9 | 8 | 9 | 6 |" in result.markdown()
+    # The stored form carries scores, not rendered bars
+    assert len(result.to_json()) < len(text.encode("utf-8"))
+    assert "█" not in result.to_json()
+
+
+def test_plain_dicts_from_storage_render_the_same_text():
+    agent = AnalysisAgent()
+    result = agent.analyze(["CNN", "LSTM"])
+    restored = AnalysisResult.of(json.loads(result.to_json()))
+    assert restored.text() == result.text()
+    assert pickle.loads(pickle.dumps(result)).text() == result.text()
+    described = agent.analyze([{"name": "BERT", "task": "Encoder"}])
+    assert "  - Task: Encoder" in described.text()
+    assert "BERT" in AnalysisResult.of(json.loads(described.to_json())).text()
+
+
+def test_same_item_set_is_analyzed_once_in_any_order():
+    agent = AnalysisAgent()
+    first = agent.analyze([{"name": "RMSProp"}, {"name": "Adam"}])
+    second = agent.analyze(["Adam", {"name": "RMSProp", "use_case": "other wording"}, "Adam"])
+    assert [item["name"] for item in second["comparisons"][0]["items"]] == ["Adam", "RMSProp"]
+    assert second.text() == first.text()
+    assert second["analysis_id"] != first["analysis_id"] and second["items_analyzed"] == 3
+    stats = agent.analysis_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_metric_changes_invalidate_cached_comparisons():
+    agent = AnalysisAgent()
+    before = agent.analyze([{"name": "Adam"}])
+    agent.add_metrics("optimization", {"Adam": {"convergence": 10, "speed": 8, "stability": 9, "memory": 6}})
+    after = agent.analyze([{"name": "Adam"}])
+    assert before["comparisons"][0]["items"][0]["scores"]["convergence"] == 9
+    assert after["comparisons"][0]["items"][0]["scores"]["convergence"] == 10
+    assert agent.metrics_version == 1 and agent.analysis_cache.stats()["hits"] == 0
+
+
+def test_cached_comparisons_cannot_go_stale_behind_the_cache():
+    agent = AnalysisAgent()
+    rows = {"Adam": {"convergence": 9, "speed": 8, "stability": 9, "memory": 6}}
+    agent.add_metrics("optimization", rows)
+    agent.analyze([{"name": "Adam"}])
+    with pytest.raises(TypeError):
+        agent.comparison_metrics["optimization"]["Adam"]["speed"] = 1
+    rows["Adam"]["speed"] = 1
+    cached = agent.analyze([{"name": "Adam"}])
+    assert agent.analysis_cache.stats()["hits"] == 1
+    assert cached["comparisons"][0]["items"][0]["scores"]["speed"] == 8
+    assert agent.compare(["Adam"], "optimization")["ranking"] == [("Adam", 8.0)]
+
+
+def test_editing_a_result_leaves_cached_comparisons_alone():
+    agent = AnalysisAgent()
+    first = agent.analyze(["Adam", "RMSProp"])
+    first["comparisons"][0]["items"][0]["scores"]["speed"] = 0
+    first["comparisons"][0]["items"].pop()
+    second = agent.analyze(["RMSProp", "Adam"])
+    assert agent.analysis_cache.stats()["hits"] == 1
+    assert [item["name"] for item in second["comparisons"][0]["items"]] == ["Adam", "RMSProp"]
+    assert second["comparisons"][0]["items"][0]["scores"]["speed"] == 8
@@ -0,0 +1,71 @@
+"""
+Unit tests for the vectorized MetricMatrix comparison engine
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.analysis_agent import AnalysisAgent
+from agents.comparison_engine import MetricMatrix
+
+
+def test_matrix_round_trips_the_registry():
+    agent = AnalysisAgent()
+    for domain, rows in agent.comparison_metrics.items():
+        engine = agent.engines[domain]
+        assert engine.names == list(rows)
+        assert all(engine.record(name) == fields for name, fields in rows.items())
+
+
+def test_weighted_ranking_matches_a_python_loop():
+    agent = AnalysisAgent()
+    weights = {"convergence": 2.0, "stability": 1.0, "memory": -1.0}
+    rows = agent.comparison_metrics["optimization"]
+    expected = sorted(((name, sum(rows[name][m] * w for m, w in weights.items()) / 4.0) for name in rows),
+                      key=lambda pair: -pair[1])
+    ranking = agent.engines["optimization"].rank(weights)
+    assert [name for name, _ in ranking] == [name for name, _ in expected]
+    assert np.allclose([score for _, score in ranking], [score for _, score in expected])
+
+    result = agent.compare(["Adagrad", "Adam", "Unknown"], "optimization", weights)
+    assert result["names"] == ["Adam", "Adagrad"]
+    assert result["pairwise"][0][1] == -result["pairwise"][1][0] > 0
+
+
+def test_missing_metrics_score_as_zero():
+    engine = MetricMatrix({"a": {"x": 4, "y": 2}, "b": {"x": 6, "note": "text"}})
+    assert engine.metrics == ["x", "y"]
+    assert engine.notes == {"b": {"note": "text"}}
+    assert engine.top_k(1, {"y": 1.0}) == [("a", 2.0)]
+    names, table = engine.pairwise("x")
+    assert names == ["a", "b"] and table.tolist() == [[0.0, -2.0], [2.0, 0.0]]
+
+
+class _CountingList(list):
+    reads = 0
+
+    def __getitem__(self, index):
+        _CountingList.reads += 1
+        return super().__getitem__(index)
+
+
+def test_thousands_of_items_across_dozens_of_metrics():
+    rng = np.random.default_rng(0)
+    rows = {f"item{i}": {f"m{j}": float(v) for j, v in enumerate(row)} for i, row in enumerate(rng.random((5000, 40)))}
+    agent = AnalysisAgent()
+    agent.add_metrics("synthetic", rows)
+    engine = agent.engines["synthetic"]
+    engine.names = _CountingList(engine.names)
+    weights = {f"m{j}": 1.0 for j in range(0, 40, 3)}
+    _CountingList.reads = 0
+    top = engine.top_k(10, weights)
+    names, table = engine.pairwise(weights=weights, names=[name for name, _ in top])
+    # Scoring all 5000 rows is array work; Python only touches the 10 selected names, twice
+    assert _CountingList.reads == 20
+    scores = engine.scores(weights)
+    assert [name for name, _ in top] == [f"item{i}" for i in np.argsort(-scores, kind="stable")[:10]]
+    assert names == [name for name, _ in top] and table.shape == (10, 10)
@@ -0,0 +1,99 @@
+"""
+Unit tests for the Coordinator's sync and async query APIs
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.coordinator import Coordinator
+from agents.memory_agent import MemoryAgent
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    coordinator = Coordinator(memory_agent=MemoryAgent(str(tmp_path / "store.db"), write_mode="behind"))
+    yield coordinator
+    coordinator.memory_agent.close()
+
+
+def test_sync_wrapper_stores_before_returning(coordinator):
+    result = coordinator.handle_query("Research neural networks")
+    assert result["source"] == "execution"
+    assert coordinator.memory_agent.get_all() == [result["response"]]
+
+
+def test_concurrent_async_queries_match_sync_results(coordinator):
+    queries = [f"Compare adam vs sgd {n}" for n in range(20)] + [f"Research lstm {n}" for n in range(20)]
+
+    async def run():
+        results = await asyncio.gather(*(coordinator.handle_query_async(q) for q in queries))
+        await coordinator.drain()
+        return results
+
+    results = asyncio.run(run())
+    assert [r["source"] for r in results] == ["execution"] * len(queries)
+    assert all("analysis" in r["response"] for r in results[:20])
+    assert len(coordinator.memory_agent.get_all()) == len(queries)
+    research_ids = [r["response"]["research"]["research_id"] for r in results]
+    assert len(set(research_ids)) == len(queries)
+
+
+def test_sync_api_works_inside_a_running_loop(coordinator):
+    async def call_sync():
+        return coordinator.handle_query("Research transformer")
+
+    assert asyncio.run(call_sync())["source"] == "execution"
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_handle_queries_dedupes_and_keeps_input_order(coordinator, processes):
+    queries = ["Research LSTM", "Compare adam vs sgd", "research lstm!", "Explain transformer"]
+    results = coordinator.handle_queries(queries, workers=2, processes=processes)
+    assert [r["duplicate"] for r in results] == [False, False, True, False]
+    assert results[0]["response"] == results[2]["response"]
+    assert "analysis" in results[1]["response"]
+    assert all(r["elapsed_ms"] >= 0 for r in results)
+    # One entry per distinct query, written by the bulk store
+    assert len(coordinator.memory_agent.get_all()) == 3
+    # A repeat is answered from the cache without re-running the pipeline
+    again = coordinator.handle_queries(["explain transformer"])
+    assert again[0]["response"] == results[3]["response"]
+    assert len(coordinator.memory_agent.get_all()) == 3
+
+
+def test_store_many_matches_individual_stores(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"))
+    assert agent.store_many([("adam", {"n": 1}), ("lstm", {"n": 2})]) == ["mem_1", "mem_2"]
+    assert agent.store("cnn", {"n": 3}) == "mem_3"
+    assert agent.retrieve("lstm") == {"n": 2}
+
+
+def test_research_step_pulls_only_the_top_items(coordinator):
+    coordinator.research_limit = 2
+    research = coordinator.handle_query("Research neural networks")["response"]["research"]
+    assert len(research["result"]) == 2
+    assert research["items_found"] == 6 and research["has_more"]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_memory_hit_never_starts_research(coordinator, monkeypatch, use_async):
+    researched = []
+    monkeypatch.setattr(coordinator, "_retrieve_from_memory_advanced", lambda query: ({"research": {}}, 0.9))
+    monkeypatch.setattr(coordinator, "_research", researched.append)
+    query = "Research neural networks"
+    result = asyncio.run(coordinator.handle_query_async(query)) if use_async else coordinator.handle_query(query)
+    assert result["source"] == "memory"
+    assert researched == []
+
+
+def test_default_memory_is_unbounded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    memory = Coordinator().memory_agent
+    assert memory.write_mode == "sync" and memory.max_records is None and memory.dedupe_threshold is None
+    assert memory._compactor is None
+    memory.close()
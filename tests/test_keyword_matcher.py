@@ -0,0 +1,67 @@
+"""
+Unit tests for the Aho-Corasick keyword matcher
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.coordinator import Coordinator
+from agents.keyword_matcher import KeywordMatcher
+
+
+def test_finds_overlapping_terms_across_vocabularies():
+    matcher = KeywordMatcher({"a": {"neural": 1, "neural networks": 2}, "b": ["network", "networks"]})
+    found = [(m.term, m.label, m.exact) for m in matcher.scan("Neural networks, please")]
+    assert found == [("neural networks", "a", True), ("neural", "a", True),
+                     ("networks", "b", True), ("network", "b", False)]
+
+
+def test_respects_word_boundaries():
+    matcher = KeywordMatcher({"context": ["we", "what did"], "research": ["learn", "how"]})
+    assert matcher.scan("the answer between us, showing") == []
+    assert [m.term for m in matcher.scan("What did we learn?")] == ["what did", "we", "learn"]
+    # Inflections still match, flagged as inexact
+    assert [(m.term, m.exact) for m in matcher.scan("learning")] == [("learn", False)]
+
+
+def test_hyphenated_words_are_not_split():
+    matcher = KeywordMatcher({"technical": ["learning", "deep"], "research": ["q-learning"]})
+    assert [m.term for m in matcher.scan("Explain Q-learning")] == ["q-learning"]
+    assert matcher.scan("deep-learning overview") == []
+
+
+class _CountingDict(dict):
+    probes = 0
+
+    def __contains__(self, key):
+        _CountingDict.probes += 1
+        return super().__contains__(key)
+
+    def get(self, key, default=None):
+        _CountingDict.probes += 1
+        return super().get(key, default)
+
+
+def test_scales_to_large_vocabularies():
+    matcher = KeywordMatcher({"big": [f"term{n}x" for n in range(50000)]})
+    matcher.build()
+    matcher._goto = [_CountingDict(node) for node in matcher._goto]
+    text = "some query mentioning term123x and term49999x " * 4
+    _CountingDict.probes = 0
+    matches = matcher.scan(text)
+    # One goto lookup per character plus amortized failure steps, whatever the vocabulary size
+    assert _CountingDict.probes <= 3 * len(text)
+    assert {m.term for m in matches} == {"term123x", "term49999x"}
+
+
+def test_coordinator_context_detection_ignores_substrings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    coordinator = Coordinator()
+    assert "context" not in coordinator._scan("What is the difference between CNN and RNN?")
+    assert "context" in coordinator._scan("What did we discuss earlier?")
+    assert coordinator._extract_topic_advanced("Compare Adam vs. SGD") == "adam sgd"
+    assert coordinator._extract_topic_advanced("Explain Q-learning") == "q-learning"
+    assert coordinator._extract_topic_advanced("deep-learning overview") == "deep-learning"
+    coordinator.memory_agent.close()
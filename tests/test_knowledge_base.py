@@ -0,0 +1,156 @@
+"""
+Unit tests for the file-backed, lazily materialized KnowledgeBase
+"""
+
+import json
+import pickle
+import struct
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.knowledge_base import DEFAULT_KB_PATH, SNAPSHOT_SUFFIX, KnowledgeBase, load_knowledge_base
+from agents.research_agent import ResearchAgent
+
+
+def _write_kb(path: Path, categories: int = 3, items: int = 4):
+    with open(path, "w", encoding="utf-8") as f:
+        for c in range(categories):
+            f.write(json.dumps({"category": f"topic {c}", "items": [], "description": f"about {c}"}) + "\n")
+            for i in range(items):
+                f.write(json.dumps({"category": f"topic {c}", "name": f"Model{c}x{i}", "rank": i}) + "\n")
+    return path
+
+
+def test_categories_materialize_on_first_access(tmp_path):
+    kb = KnowledgeBase(str(_write_kb(tmp_path / "kb.jsonl")))
+    assert list(kb) == ["topic 0", "topic 1", "topic 2"]
+    assert "topic 1" in kb and len(kb) == 3
+    assert not any(entry["materialized"] for entry in kb.report()["categories"].values())
+
+    content = kb["topic 1"]
+    assert content["description"] == "about 1"
+    assert [item["name"] for item in content["items"]] == [f"Model1x{i}" for i in range(4)]
+    assert kb["topic 1"] is content
+    with pytest.raises(TypeError):
+        content["items"] = []
+
+    report = kb.report()["categories"]
+    assert report["topic 1"]["materialized"] and report["topic 1"]["resident_bytes"] > 0
+    assert report["topic 1"]["items"] == 4
+    assert not report["topic 0"]["materialized"]
+
+
+def test_snapshot_is_reused_until_the_source_changes(tmp_path):
+    source = _write_kb(tmp_path / "kb.jsonl")
+    first = KnowledgeBase(str(source))
+    assert not first.from_snapshot
+    assert Path(str(source) + SNAPSHOT_SUFFIX).exists()
+    second = KnowledgeBase(str(source))
+    assert second.from_snapshot
+    assert dict(second["topic 2"]) == dict(first["topic 2"])
+
+    _write_kb(source, categories=2)
+    third = KnowledgeBase(str(source))
+    assert not third.from_snapshot and len(third) == 2
+    # Instances opened before the rewrite keep reading their own snapshot
+    assert second["topic 0"]["description"] == "about 0"
+
+
+_EXECUTED = []
+
+
+class _Payload:
+    def __reduce__(self):
+        return _EXECUTED.append, ("unpickled",)
+
+
+def test_snapshot_is_data_only(tmp_path):
+    source = _write_kb(tmp_path / "kb.jsonl")
+    snapshot = Path(str(source) + SNAPSHOT_SUFFIX)
+    KnowledgeBase(str(source))
+    magic = snapshot.read_bytes()[:7]
+    header = pickle.dumps(_Payload())
+    # A pickle planted where the header goes is rejected (and recompiled), never executed
+    snapshot.write_bytes(magic + struct.pack("<Q", len(header)) + header)
+    kb = KnowledgeBase(str(source))
+    assert not kb.from_snapshot and _EXECUTED == []
+    assert kb["topic 0"]["items"][0]["name"] == "Model0x0"
+    assert KnowledgeBase(str(source)).from_snapshot
+
+
+def test_unwritable_snapshot_falls_back_to_memory(tmp_path, monkeypatch):
+    source = _write_kb(tmp_path / "kb.jsonl")
+    monkeypatch.setattr("agents.knowledge_base.os.replace", _raise_oserror)
+    kb = KnowledgeBase(str(source))
+    assert not Path(str(source) + SNAPSHOT_SUFFIX).exists()
+    assert kb["topic 0"]["items"][0]["name"] == "Model0x0"
+
+
+def _raise_oserror(*args):
+    raise OSError("read-only")
+
+
+def test_one_shared_instance_across_agents_and_threads(tmp_path):
+    source = str(_write_kb(tmp_path / "kb.jsonl"))
+    loaded = []
+    threads = [threading.Thread(target=lambda: loaded.append(load_knowledge_base(source))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(kb is loaded[0] for kb in loaded)
+    assert ResearchAgent(source).knowledge_base is ResearchAgent(source).knowledge_base
+    assert ResearchAgent().knowledge_base is load_knowledge_base(DEFAULT_KB_PATH)
+
+
+def test_shared_items_cannot_be_modified_through_results():
+    first = ResearchAgent().research("cnn")["result"][0]
+    with pytest.raises(TypeError):
+        first["name"] = "HACKED"
+    with pytest.raises(TypeError):
+        first.update(name="HACKED")
+    assert ResearchAgent().research("cnn")["result"][0]["name"] == first["name"] != "HACKED"
+    # Still a dict for callers: serializes as JSON, pickles for process pools, copies mutable
+    assert json.loads(json.dumps(first)) == first
+    assert pickle.loads(pickle.dumps(first)) == first
+    copy = dict(first)
+    copy["name"] = "Mine"
+    assert first["name"] != "Mine"
+
+
+def test_json_source(tmp_path):
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps({"topic": {"description": "json", "items": [{"name": "Alpha", "tags": ["a"]}]}}))
+    kb = KnowledgeBase(str(path))
+    assert kb["topic"]["description"] == "json"
+    assert list(kb["topic"]["items"]) == [{"name": "Alpha", "tags": ("a",)}]
+
+    path.write_text(json.dumps([{"category": "topic", "name": "Alpha"}]))
+    with pytest.raises(ValueError):
+        KnowledgeBase(str(path), snapshot=False)
+
+
+def test_index_uses_snapshot_postings_without_loading_items(tmp_path):
+    kb = KnowledgeBase(str(_write_kb(tmp_path / "kb.jsonl")))
+    agent = ResearchAgent(kb)
+    assert not any(entry["materialized"] for entry in kb.report()["categories"].values())
+    assert agent.index.items_matching("topic 2", "model2x3") == [kb["topic 2"]["items"][3]]
+
+
+def test_parquet_source(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+
+    rows = [{"category": "topic", "description": "parquet"},
+            {"category": "topic", "name": "Alpha", "tags": ["a", "b"]},
+            {"category": "topic", "name": "Beta", "rank": 2}]
+    path = tmp_path / "kb.parquet"
+    pd.DataFrame(rows).to_parquet(path)
+    kb = KnowledgeBase(str(path))
+    assert kb["topic"]["description"] == "parquet"
+    assert list(kb["topic"]["items"]) == [{"name": "Alpha", "tags": ("a", "b")}, {"name": "Beta", "rank": 2}]
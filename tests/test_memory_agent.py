@@ -0,0 +1,320 @@
+"""
+Unit tests for MemoryAgent storage and retrieval
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from agents.memory_agent import MemoryAgent, embed, embed_batch
+from agents.vector_index import IVFVectorIndex, normalize_rows
+
+
+def test_embed_counts_letters_only():
+    vec = embed("Adam vs. SGD! 42 ä")
+    assert vec.shape == (26,)
+    assert vec[0] == 2 and vec[ord("s") - ord("a")] == 2 and vec.sum() == 9
+    texts = ["Adam vs. SGD! 42 ä", "", "LSTM"]
+    assert np.array_equal(embed_batch(texts), np.array([embed(t) for t in texts]))
+
+
+def test_store_and_retrieve(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"))
+    record_id = agent.store("neural networks", {"research": {"topic": "neural"}})
+    assert record_id == "mem_1"
+    assert agent.retrieve("neural networks") == {"research": {"topic": "neural"}}
+    assert agent.retrieve("qqqq zzzz") is None
+
+
+def test_ids_are_monotonic_after_clear(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"))
+    agent.store("adam", {})
+    agent.store("sgd", {})
+    agent.clear()
+    assert agent.get_all() == []
+    assert agent.store("rmsprop", {}) == "mem_3"
+
+
+def test_search_by_keywords(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"))
+    agent.store("adam", {"keywords": ["optimizer", "adaptive"], "name": "Adam"})
+    agent.store("cnn", {"keywords": ["vision"], "name": "CNN"})
+    assert agent.search_by_keywords(["adaptive"]) == [
+        {"keywords": ["optimizer", "adaptive"], "name": "Adam"}
+    ]
+    assert agent.search_by_keywords(["missing"]) == []
+
+
+def test_migrates_legacy_json_store(tmp_path):
+    legacy = tmp_path / "store.json"
+    legacy.write_text(json.dumps([
+        {"id": "mem_1", "topic": "lstm", "vector": embed("lstm").tolist(),
+         "record": {"name": "LSTM"}, "timestamp": "2025-01-01T00:00:00", "keywords": []},
+        {"id": "mem_2", "topic": "gru", "vector": embed("gru").tolist(),
+         "record": {"name": "GRU"}, "timestamp": "2025-01-01T00:00:00", "keywords": []},
+    ]))
+    agent = MemoryAgent(str(legacy))
+    assert agent.get_all() == [{"name": "LSTM"}, {"name": "GRU"}]
+    assert not legacy.exists()
+    assert agent.store("cnn", {}) == "mem_3"
+    # Reopening does not import twice
+    assert len(MemoryAgent(str(legacy)).get_all()) == 3
+
+
+def test_retrieve_top_k_orders_by_score(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"))
+    agent.store("adam optimizer", {"name": "Adam"})
+    agent.store("convolutional network", {"name": "CNN"})
+    agent.store("adam", {"name": "Adam only"})
+    matches = agent.retrieve_top_k("adam", k=2)
+    assert [m["record"]["name"] for m in matches] == ["Adam only", "Adam"]
+    assert matches[0]["id"] == "mem_3"
+    assert matches[0]["score"] >= matches[1]["score"]
+    assert agent.retrieve_top_k("adam", k=5, threshold=0.99) == matches[:1]
+
+
+def test_sees_entries_written_by_another_instance(tmp_path):
+    path = str(tmp_path / "store.db")
+    reader = MemoryAgent(path)
+    writer = MemoryAgent(path)
+    writer.store("transformer", {"name": "Transformer"})
+    assert reader.retrieve("transformer") == {"name": "Transformer"}
+    writer.clear()
+    assert reader.retrieve("transformer") is None
+
+
+def test_ivf_index_matches_exact_and_persists(tmp_path):
+    path = str(tmp_path / "store.db")
+    agent = MemoryAgent(path, index="ivf", nprobe=4)
+    agent.index.min_train_size = 50
+    topics = [f"topic {word}" for word in
+              ["adam", "sgd", "cnn", "rnn", "lstm", "gru", "bert", "gpt", "ppo", "dqn"] * 6]
+    for i, topic in enumerate(topics):
+        agent.store(topic + f" {i}", {"n": i})
+    agent.index.wait_for_training()
+    assert agent.index.trained
+    assert agent.retrieve("topic lstm 4") == {"n": 4}
+
+    report = agent.recall_report(["topic adam", "topic bert"], nprobe_values=(len(agent.index.centroids),))
+    assert report[0]["recall_at_k"] == 1.0
+
+    reopened = MemoryAgent(path, index="ivf", nprobe=4)
+    assert reopened.index.trained
+    assert reopened.retrieve("topic lstm 4") == {"n": 4}
+
+
+def test_ivf_trains_in_the_background_and_assigns_in_blocks(monkeypatch):
+    monkeypatch.setattr("agents.vector_index.ASSIGN_BLOCK_CELLS", 16)
+    release = threading.Event()
+    fit = IVFVectorIndex._fit
+
+    def held_fit(self, parts, total):
+        release.wait(10)
+        return fit(self, parts, total)
+
+    monkeypatch.setattr(IVFVectorIndex, "_fit", held_fit)
+    vectors = np.random.default_rng(0).random((300, 8))
+    index = IVFVectorIndex(8, n_lists=4, min_train_size=200)
+    index.add(np.arange(1, 201), vectors[:200])
+    # KMeans is still running: adds and (exact) searches carry on meanwhile
+    index.add(np.arange(201, 301), vectors[200:])
+    assert not index.trained and index.search(vectors[250])[0][0] == 251
+    release.set()
+    index.wait_for_training()
+    assert index.trained and index.retrain_count == 1
+    assert len(index) == index.trained_size == 300
+    assert index.search(vectors[250], nprobe=4)[0][0] == 251
+    assert sorted(index._all_vectors()[1]) == list(range(1, 301))
+
+
+def test_hashed_ngram_backend_separates_anagrams(tmp_path):
+    path = str(tmp_path / "store.db")
+    legacy = MemoryAgent(path)
+    legacy.store("compare adam and rmsprop", {"name": "optimizers"})
+    # Letter counts cannot tell these apart
+    assert legacy.retrieve("compare madam and rmsprop ") is not None
+
+    agent = MemoryAgent(path, embedding="hashed_ngram")
+    # Existing entries are embedded with the new backend on first use
+    assert agent.retrieve("compare adam and rmsprop") == {"name": "optimizers"}
+    agent.store("silent night", {"name": "carol"})
+    assert agent.retrieve("listen nights", threshold=0.5) is None
+    assert agent.retrieve_top_k("silent night")[0]["record"] == {"name": "carol"}
+    assert legacy.retrieve("silent night") == {"name": "carol"}
+
+
+def test_vectors_are_served_from_shared_mapping(tmp_path):
+    path = str(tmp_path / "store.db")
+    agent = MemoryAgent(path)
+    agent.store("gradient descent", {"name": "GD"})
+    agent.store("policy gradient", {"name": "PG"})
+    matrix, ids = agent.vector_file.view()
+    assert list(ids) == [1, 2] and matrix.shape == (2, 26)
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0)
+
+    # The vector file is derived data: a fresh process rebuilds it from the store
+    agent.vector_file.remove()
+    assert MemoryAgent(path).retrieve("policy gradient") == {"name": "PG"}
+
+
+def test_write_behind_buffers_then_group_commits(tmp_path):
+    path = str(tmp_path / "store.db")
+    agent = MemoryAgent(path, write_mode="behind", batch_size=4, flush_interval=60)
+    other = MemoryAgent(path)
+    ids = [agent.store(topic, {"name": topic}) for topic in ["adam", "sgd", "cnn"]]
+    assert ids == ["mem_1", "mem_2", "mem_3"]
+    # Buffered stores are visible locally straight away, not yet on disk
+    assert agent.retrieve("sgd") == {"name": "sgd"}
+    assert agent.get_write_stats()["queue_depth"] == 3
+    assert other.get_all() == []
+
+    agent.flush()
+    stats = agent.get_write_stats()
+    assert stats["queue_depth"] == 0 and stats["flushed_records"] == 3 and stats["flushes"] == 1
+    assert other.retrieve("cnn") == {"name": "cnn"}
+
+    agent.store("lstm", {"name": "lstm"})
+    agent.close()
+    assert other.retrieve("lstm") == {"name": "lstm"}
+    assert len(other.get_all()) == 4
+
+
+def test_write_behind_flushes_full_batches_in_background(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"), write_mode="behind",
+                        durability="fsync", batch_size=2, flush_interval=60)
+    agent.store("adam", {})
+    agent.store("sgd", {})
+    deadline = time.time() + 5
+    while agent.get_write_stats()["flushed_records"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert agent.get_write_stats()["flushed_records"] == 2
+    agent.close()
+
+
+def test_failed_background_flush_is_retried(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"), write_mode="behind", batch_size=1, flush_interval=60)
+    insert_many = agent.store_backend.insert_many
+    failures = []
+
+    def flaky_insert(*args, **kwargs):
+        if len(failures) < 2:
+            failures.append(1)
+            raise OSError("disk full")
+        return insert_many(*args, **kwargs)
+
+    agent.store_backend.insert_many = flaky_insert
+    agent.store("adam", {"r": 1})
+    deadline = time.time() + 5
+    while agent.get_write_stats()["flushed_records"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    stats = agent.get_write_stats()
+    assert stats["flushed_records"] == 1 and stats["queue_depth"] == 0
+    assert stats["failed_flushes"] == 2 and "disk full" in stats["last_flush_error"]
+    agent.close()
+    assert MemoryAgent(str(tmp_path / "store.db")).retrieve("adam") == {"r": 1}
+
+
+def test_failed_background_compaction_is_retried(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"), max_records=1, compact_interval=0.05)
+    lru_entries = agent.store_backend.lru_entries
+    failures = []
+
+    def locked_lru(*args):
+        if len(failures) < 2:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return lru_entries(*args)
+
+    agent.store_backend.lru_entries = locked_lru
+    agent.store("adam", {"r": 1})
+    agent.store("lstm", {"r": 2})
+    deadline = time.time() + 5
+    while not agent.compaction_stats.get("evicted") and time.time() < deadline:
+        time.sleep(0.01)
+    assert agent.compaction_stats["evicted"] == 1 and agent.compaction_stats["failed_compactions"] == 2
+    assert agent.get_all() == [{"r": 2}]
+    agent.close()
+
+
+def test_ttl_expires_old_entries(tmp_path, monkeypatch):
+    agent = MemoryAgent(str(tmp_path / "store.db"), ttl=60)
+    with monkeypatch.context() as m:
+        m.setattr(time, "time", lambda: 1000.0)
+        agent.store("stale topic", {"name": "old"})
+    agent.store("fresh topic", {"name": "new"})
+    stats = agent.compact()
+    assert stats["expired"] == 1 and stats["remaining"] == 1
+    assert [r["name"] for r in agent.get_all()] == ["new"]
+    assert agent.retrieve("fresh topic")["name"] == "new"
+
+
+def test_capacity_evicts_least_recently_hit(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"), max_records=2)
+    agent.store("alpha", {"name": "a"})
+    agent.store("bravo", {"name": "b"})
+    agent.store("charlie", {"name": "c"})
+    agent.retrieve("alpha")
+    assert agent.entry_stats("mem_1")["hits"] == 1
+    stats = agent.compact()
+    assert stats["evicted"] == 1
+    assert sorted(r["name"] for r in agent.get_all()) == ["a", "c"]
+    assert agent.retrieve("bravo", threshold=0.99) is None
+    # Other instances follow the compacted generation
+    assert len(MemoryAgent(str(tmp_path / "store.db")).vector_file.view()[1]) == 2
+
+
+def test_near_duplicates_are_collapsed(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"))
+    agent.store("transformer model", {"name": "first"})
+    agent.store("model transformer", {"name": "second"})
+    agent.store("recurrent network", {"name": "rnn"})
+    assert agent.compact()["collapsed"] == 0
+    agent.dedupe_threshold = 0.999
+    stats = agent.compact()
+    assert stats["collapsed"] == 1 and stats["remaining"] == 2
+    assert agent.retrieve("transformer model")["name"] == "second"
+    # New near-duplicates overwrite the existing entry in place
+    assert agent.store("transformer model", {"name": "third"}) == "mem_2"
+    # One hit from the retrieve above, one from the collapsed store
+    assert agent.entry_stats("mem_2")["hits"] == 2
+    assert len(agent.get_all()) == 2
+
+
+def _cosine(a: str, b: str) -> float:
+    return float(normalize_rows(embed(a))[0] @ normalize_rows(embed(b))[0])
+
+
+def test_compaction_collapses_by_cosine_threshold(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"))
+    agent.store("convolutional network", {"name": "a"})
+    agent.store("convolutional networks", {"name": "b"})
+    agent.store("zebra quokka", {"name": "c"})
+    agent.store("zebra quokkas", {"name": "d"})
+    near = _cosine("convolutional network", "convolutional networks")
+    far = _cosine("zebra quokka", "zebra quokkas")
+    assert 0.9 < far < near < 1.0
+    # Non-identical vectors collapse at their actual cosine; a pair just below the threshold stays
+    agent.dedupe_threshold = (near + far) / 2
+    stats = agent.compact()
+    assert stats["collapsed"] == 1 and stats["remaining"] == 3
+    assert sorted(record["name"] for record in agent.get_all()) == ["b", "c", "d"]
+
+
+def test_retrieve_many_matches_single_retrieves(tmp_path):
+    topics = ["adam optimizer", "convolutional network", "recurrent network", "unrelated zebra"]
+    for name, options in [("exact", {}), ("hashed", {"embedding": "hashed_ngram"}),
+                          ("behind", {"write_mode": "behind", "flush_interval": 60})]:
+        agent = MemoryAgent(str(tmp_path / f"{name}.db"), **options)
+        for topic in topics[:3]:
+            agent.store(topic, {"name": topic})
+        queries = ["adam optimizer", "recurrent networks", "qqq", "convolutional network"]
+        assert agent.retrieve_many(queries) == [agent.retrieve(q) for q in queries]
+        assert agent.retrieve_many([]) == []
+        agent.close()
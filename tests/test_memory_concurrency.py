@@ -0,0 +1,131 @@
+"""
+Multi-process stress test for the shared memory store.
+Several writer processes store and retrieve concurrently while a reader process
+keeps scanning; afterwards every record must be present exactly once. Writers
+racing a clear or compaction in another process switch to the new generation.
+"""
+
+import multiprocessing
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.memory_agent import MemoryAgent
+
+WRITERS = 4
+RECORDS_PER_WRITER = 40
+
+
+def _writer(path: str, writer: int, write_mode: str):
+    agent = MemoryAgent(path, write_mode=write_mode, batch_size=8)
+    for n in range(RECORDS_PER_WRITER):
+        topic = f"writer {writer} record {n} " + "abcdefghijklmnopqrstuvwxyz"[(writer * 7 + n) % 26] * (n % 5 + 1)
+        agent.store(topic, {"writer": writer, "n": n, "topic": topic})
+        agent.retrieve(topic)
+    agent.close()
+
+
+def _reader(path: str, stop, errors):
+    agent = MemoryAgent(path)
+    last_count = 0
+    while not stop.is_set():
+        try:
+            records = agent.get_all()
+            # Committed records never disappear and are always complete
+            if len(records) < last_count:
+                errors.put(f"record count went backwards: {last_count} -> {len(records)}")
+            last_count = len(records)
+            for record in records:
+                if set(record) != {"writer", "n", "topic"}:
+                    errors.put(f"torn record: {record}")
+            for match in agent.retrieve_top_k("writer record", k=3):
+                if set(match["record"]) != {"writer", "n", "topic"}:
+                    errors.put(f"torn match: {match}")
+        except Exception as exc:
+            errors.put(repr(exc))
+
+
+def _run_stress(tmp_path, write_mode: str):
+    path = str(tmp_path / "store.db")
+    MemoryAgent(path)
+    ctx = multiprocessing.get_context("spawn")
+    stop, errors = ctx.Event(), ctx.Queue()
+    reader = ctx.Process(target=_reader, args=(path, stop, errors))
+    reader.start()
+    writers = [ctx.Process(target=_writer, args=(path, w, write_mode)) for w in range(WRITERS)]
+    for proc in writers:
+        proc.start()
+    for proc in writers:
+        proc.join(120)
+        assert proc.exitcode == 0
+    stop.set()
+    reader.join(30)
+
+    problems = []
+    while not errors.empty():
+        problems.append(errors.get())
+    assert problems == []
+
+    agent = MemoryAgent(path)
+    records = agent.get_all()
+    assert len(records) == WRITERS * RECORDS_PER_WRITER
+    assert {(r["writer"], r["n"]) for r in records} == {
+        (w, n) for w in range(WRITERS) for n in range(RECORDS_PER_WRITER)
+    }
+    # The shared vector file holds every entry exactly once
+    _, ids = agent.vector_file.view()
+    assert len(ids) == len(set(ids.tolist())) == WRITERS * RECORDS_PER_WRITER
+    for record in records[::17]:
+        assert agent.retrieve(record["topic"], threshold=0.99) is not None
+
+
+def test_concurrent_sync_writers(tmp_path):
+    _run_stress(tmp_path, "sync")
+
+
+def test_concurrent_write_behind_writers(tmp_path):
+    _run_stress(tmp_path, "behind")
+
+
+def _stale_generation_once(agent: MemoryAgent):
+    # Make the agent's next sync read the generation it already has, as if it had
+    # looked just before another process switched generations
+    real = agent.store_backend.generation
+    stale = [agent._generation]
+    agent.store_backend.generation = lambda: stale.pop() if stale else real()
+
+
+def _assert_writer_recovers(tmp_path, writer: MemoryAgent, other: MemoryAgent, switch):
+    _stale_generation_once(writer)
+    switch(other)
+    record_id = writer.store("lstm networks", {"n": 99})
+    assert record_id is not None
+    assert writer.retrieve("lstm networks") == {"n": 99}
+    assert other.retrieve("lstm networks") == {"n": 99}
+
+
+def test_writer_survives_clear_in_another_process(tmp_path):
+    path = str(tmp_path / "store.db")
+    writer, other = MemoryAgent(path), MemoryAgent(path)
+    writer.store("adam optimizer", {"n": 1})
+    old = writer._generation
+    # No files of the removed generation may be left behind (e.g. a recreated lock)
+    _assert_writer_recovers(tmp_path, writer, other, lambda agent: agent.clear())
+    assert writer._generation != old
+    assert not list(tmp_path.glob(f"store.*.g{old}.*"))
+    assert len(writer.get_all()) == 1
+
+
+def test_writer_survives_compaction_in_another_process(tmp_path):
+    path = str(tmp_path / "store.db")
+    writer = MemoryAgent(path)
+    for topic in ("adam optimizer", "convolutional network", "transformer model"):
+        writer.store(topic, {"topic": topic})
+    other = MemoryAgent(path, max_records=1)
+    old = writer._generation
+    # No files of the removed generation may be left behind (e.g. a recreated lock)
+    _assert_writer_recovers(tmp_path, writer, other, lambda agent: agent.compact())
+    assert writer._generation != old
+    assert not list(tmp_path.glob(f"store.*.g{old}.*"))
+    assert len(writer.get_all()) == 2
@@ -0,0 +1,50 @@
+"""
+Unit tests for the Coordinator's normalized query cache
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.memory_agent import MemoryAgent
+from agents.query_cache import QueryCache, normalize_query
+
+
+def test_normalizes_case_punctuation_and_whitespace():
+    assert normalize_query("  Compare ADAM,  vs SGD? ") == "compare adam vs sgd"
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = QueryCache(max_entries=2, ttl=None)
+    assert cache.get("adam") is None
+    cache.put("adam", {"r": 1})
+    cache.put("sgd", {"r": 2})
+    assert cache.get("Adam!") == {"r": 1}
+    cache.put("lstm", {"r": 3})
+    assert cache.get("sgd") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (1, 2, 1, 2)
+
+
+def test_entries_expire_after_ttl():
+    cache = QueryCache(ttl=0.0)
+    cache.put("adam", {"r": 1})
+    assert cache.get("adam") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_memory_clear_invalidates_cache(tmp_path):
+    agent = MemoryAgent(str(tmp_path / "store.db"))
+    cache = QueryCache()
+    agent.add_clear_listener(cache.clear)
+    cache.put("adam", {"r": 1})
+    agent.clear()
+    assert len(cache) == 0
+
+
+def test_custom_keys_are_used_as_given():
+    cache = QueryCache(max_entries=2, ttl=None, key=None)
+    cache.put((1, frozenset({"Adam", "SGD"})), "result")
+    assert cache.get((1, frozenset({"SGD", "Adam"}))) == "result"
+    assert cache.get((2, frozenset({"SGD", "Adam"}))) is None
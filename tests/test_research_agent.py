@@ -0,0 +1,177 @@
+"""
+Unit tests for ResearchAgent lookups over the knowledge base index
+"""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.coordinator import Coordinator
+from agents.knowledge_base import KnowledgeBase
+from agents.knowledge_index import KnowledgeIndex
+from agents.memory_agent import MemoryAgent
+from agents.research_agent import ResearchAgent
+
+
+def _names(result):
+    return [item["name"] for item in result["result"]]
+
+
+def test_category_names_win_over_keywords():
+    agent = ResearchAgent()
+    # research() splits on spaces, so go straight to the single-topic lookup
+    category, positions, _ = agent._lookup("reinforcement learning")
+    assert category == "reinforcement learning"
+    assert len(positions) == 5
+
+
+def test_longest_keyword_picks_the_specific_item():
+    agent = ResearchAgent()
+    assert _names(agent.research("q-learning")) == ["Q-Learning"]
+    assert _names(agent.research("trees")) == ["Decision Trees"]
+    assert _names(agent.research("actor")) == ["Actor-Critic"]
+    # Whole words only: Nadam is not an Adam match
+    assert _names(agent.research("adam")) == ["Adam"]
+    # Keywords with no matching item name return the whole category
+    assert len(agent.research("network")["result"]) == 6
+
+
+def test_hyphenated_topics_match_their_parts():
+    agent = ResearchAgent()
+    expected = {
+        "actor-critic": ["Actor-Critic"],
+        "gradient-descent": ["Gradient Descent"],
+        "random-forest": ["Random Forest"],
+        "logistic-regression": ["Linear Regression", "Logistic Regression"],
+        "cnn-based": ["CNN"],
+        "lstm-based": ["LSTM"],
+        "gpt-3": ["GPT"],
+        "self-attention": ["BERT", "GPT", "T5", "RoBERTa", "ELECTRA"],
+    }
+    for topic, names in expected.items():
+        assert _names(agent.research(topic)) == names, topic
+    assert _names(agent.research("Explain actor-critic methods")) == ["Actor-Critic"]
+
+
+def test_hyphenated_topics_end_to_end(tmp_path):
+    coordinator = Coordinator(memory_agent=MemoryAgent(str(tmp_path / "store.db")))
+    for query, first in [("Explain actor-critic methods", "Actor-Critic"), ("Tell me about self-attention", "BERT")]:
+        research = coordinator.handle_query(query)["response"]["research"]
+        assert research["result"][0]["name"] == first, query
+    coordinator.memory_agent.close()
+
+
+class _CountingKB(dict):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.loaded = []
+
+    def __getitem__(self, category):
+        self.loaded.append(category)
+        return super().__getitem__(category)
+
+
+def test_lookups_do_not_scan_large_knowledge_bases():
+    kb = _CountingKB({f"category {c}": {"items": [{"name": f"Model{c}x{i}"} for i in range(100)]} for c in range(500)})
+    keywords = {f"model{c}x{i}": f"category {c}" for c in range(500) for i in range(0, 100, 10)}
+    index = KnowledgeIndex(kb, keywords)
+    kb.loaded.clear()
+    keyword, category = index.best_keyword("tell me about model321x40")
+    items = index.items_matching(category, keyword)
+    assert (keyword, category) == ("model321x40", "category 321")
+    assert items == [{"name": "Model321x40"}]
+    # Answered from the index: only the matched category is read, and none is scanned
+    assert kb.loaded == ["category 321"]
+
+
+def test_research_iter_pages_in_relevance_order():
+    agent = ResearchAgent()
+    page = agent.research_iter("adam sgd", limit=2)
+    assert page.items_found == 5 and page.has_more
+    # Adam is a specific match for one sub-topic and in the whole category for the other
+    assert [item["name"] for item in page] == ["Adam", "Gradient Descent"]
+    rest = agent.research_iter("adam sgd", limit=10, offset=2)
+    assert [item["name"] for item in rest] == ["RMSProp", "Adagrad", "Nadam"]
+    assert not rest.has_more
+    # Duplicates across sub-topics are returned once
+    assert _names(agent.research_iter("lstm lstm").to_result()) == ["LSTM"]
+    assert agent.research_iter("zzz").to_result()["completeness"] == "low"
+
+
+def test_research_iter_counts_without_loading_items(tmp_path):
+    source = tmp_path / "kb.jsonl"
+    with open(source, "w") as f:
+        f.write('{"category": "models", "items": []}\n')
+        for i in range(5000):
+            f.write('{"category": "models", "name": "Model %d"}\n' % i)
+    kb = KnowledgeBase(str(source))
+    agent = ResearchAgent(kb)
+    page = agent.research_iter("models", limit=3, offset=10)
+    assert page.items_found == 5000 and len(page) == 3
+    assert not kb.report()["categories"]["models"]["materialized"]
+    assert [item["name"] for item in page] == ["Model 10", "Model 11", "Model 12"]
+
+
+def test_multi_topic_research_dedupes_across_sub_topics():
+    agent = ResearchAgent()
+    result = agent.research("network lstm network")
+    # "network" returns the whole category; LSTM, also matched by "lstm", ranks first and
+    # appears once, and the repeated sub-topic is researched once
+    assert _names(result) == ["LSTM", "CNN", "RNN", "GRU", "Transformer", "DNN"]
+    assert result["items_found"] == 6
+    assert result["matched_categories"] == ["neural networks"]
+    assert list(result["timings_ms"]) == ["network", "lstm"]
+    assert asyncio.run(agent.research_async("network lstm network"))["result"] == result["result"]
+
+
+def test_research_and_research_iter_merge_sub_topics_alike():
+    agent = ResearchAgent()
+    for topic in ("optimization adam", "adam sgd", "cnn", "network lstm"):
+        assert agent.research(topic)["result"] == agent.research_iter(topic, limit=10).to_result()["result"]
+    assert _names(agent.research("optimization adam"))[0] == "Adam"
+    page = agent.research_iter("adam sgd", limit=1).to_result()
+    assert list(page["timings_ms"]) == ["adam", "sgd"]
+
+
+def test_multi_topic_pages_load_categories_concurrently(tmp_path):
+    source = tmp_path / "kb.jsonl"
+    with open(source, "w") as f:
+        for category in ("alpha", "beta", "gamma"):
+            f.write('{"category": "%s", "items": []}\n' % category)
+            f.write('{"category": "%s", "name": "%s item"}\n' % (category, category.title()))
+
+    # Each category read waits for another one to start, so serial loading times out
+    class BarrierKB(KnowledgeBase):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def _read_blob(self, offset, length):
+            self.barrier.wait()
+            return super()._read_blob(offset, length)
+
+    kb = BarrierKB(str(source))
+    result = ResearchAgent(kb).research("alpha beta gamma")
+    assert _names(result) == ["Alpha item", "Beta item", "Gamma item"]
+    assert all(kb.materialized(category) for category in ("alpha", "beta", "gamma"))
+    # Already-decoded categories are served inline
+    assert _names(ResearchAgent(kb).research("gamma alpha")) == ["Gamma item", "Alpha item"]
+
+
+def test_multi_topic_research_dedupes_by_position():
+    # A knowledge base that hands out fresh item copies on every access
+    class CopyingKB(dict):
+        def __getitem__(self, category):
+            content = dict.__getitem__(self, category)
+            return {"items": [dict(item) for item in content["items"]]}
+
+    kb = CopyingKB({"neural networks": {"items": [{"name": "LSTM"}, {"name": "GRU"}]}})
+    result = ResearchAgent(kb).research("network lstm")
+    assert _names(result) == ["LSTM", "GRU"] and result["items_found"] == 2
+
+
+def test_multi_topic_research_without_matches_is_low_completeness():
+    result = ResearchAgent().research("zzz qqq")
+    assert result["completeness"] == "low" and result["items_found"] == 0
+    assert len(result["result"]) == 1
@@ -0,0 +1,130 @@
+"""
+Localhost tests for the HTTP/JSON query service
+"""
+
+import http.client
+import json
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.coordinator import Coordinator
+from agents.memory_agent import MemoryAgent
+from agents.session_manager import SessionManager
+from server import create_server
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    servers = []
+
+    def start(**options):
+        manager = SessionManager(Coordinator(memory_agent=MemoryAgent(str(tmp_path / "store.db"))))
+        server = create_server(port=0, session_manager=manager, **options)
+        # An empty manager is falsy (it has __len__) but must still be the one in use
+        assert server.session_manager is manager
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.session_manager.coordinator.memory_agent.close()
+
+
+def _post(conn, body):
+    conn.request("POST", "/query", json.dumps(body), {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_queries_share_a_keep_alive_connection(start_server):
+    server = start_server(workers=2)
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    status, result = _post(conn, {"query": "Research neural networks", "session_id": "s1"})
+    assert status == 200 and result["source"] == "execution"
+    status, result = _post(conn, {"query": "what did we discuss earlier", "session_id": "s1"})
+    assert status == 200 and result["source"] == "context"
+    assert _post(conn, {"nope": 1})[0] == 400
+    conn.request("GET", "/health")
+    health = json.loads(conn.getresponse().read())
+    assert health["status"] == "ok" and health["sessions"] == 1
+    # Everything above went over one connection, served by one worker
+    assert health["connections_served"] == 0
+    conn.close()
+
+
+def test_sessionless_queries_share_no_history(start_server):
+    server = start_server(workers=1)
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    assert _post(conn, {"query": "Research neural networks"})[1]["source"] == "execution"
+    status, result = _post(conn, {"query": "what did we discuss earlier"})
+    assert status == 200 and result["source"] != "context"
+    assert server.session_manager.coordinator.query_history == []
+    conn.close()
+
+
+def test_idle_keep_alive_connections_hold_no_worker(start_server):
+    server = start_server(workers=1, idle_timeout=30)
+    idle = http.client.HTTPConnection(*server.server_address, timeout=10)
+    idle.request("GET", "/health")
+    assert idle.getresponse().read()
+    # The only worker is free again although the first client keeps its connection open
+    other = http.client.HTTPConnection(*server.server_address, timeout=5)
+    other.request("GET", "/health")
+    assert json.loads(other.getresponse().read())["idle_connections"] == 1
+    idle.request("GET", "/health")
+    assert idle.getresponse().status == 200
+    for conn in (idle, other):
+        conn.close()
+
+
+def test_negative_content_length_is_rejected(start_server):
+    server = start_server(workers=1)
+    conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+    conn.putrequest("POST", "/query")
+    conn.putheader("Content-Length", "-1")
+    conn.endheaders()
+    assert conn.getresponse().status == 400
+    conn.close()
+
+
+def test_full_queue_is_rejected_with_503(start_server):
+    server = start_server(workers=1, queue_size=1, idle_timeout=10)
+    address = server.server_address
+    coordinator = server.session_manager.coordinator
+    handle_query = coordinator.handle_query
+    started, release = threading.Event(), threading.Event()
+
+    def slow_query(query, session=None):
+        started.set()
+        release.wait(10)
+        return handle_query(query, session=session)
+
+    coordinator.handle_query = slow_query
+    # A slow request occupies the only worker, the next connection fills the queue
+    busy = http.client.HTTPConnection(*address, timeout=10)
+    busy.request("POST", "/query", json.dumps({"query": "Research lstm"}))
+    assert started.wait(5)
+    queued = socket.create_connection(address)
+    deadline = time.monotonic() + 5
+    while server.health()["queue_depth"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    rejected = http.client.HTTPConnection(*address, timeout=10)
+    rejected.request("GET", "/health")
+    response = rejected.getresponse()
+    assert response.status == 503
+    assert response.getheader("Retry-After") == "1"
+    assert server.rejected == 1
+    release.set()
+    assert busy.getresponse().status == 200
+    for conn in (busy, queued, rejected):
+        conn.close()
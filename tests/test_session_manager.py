@@ -0,0 +1,60 @@
+"""
+Unit tests for per-session Coordinator state
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.session_manager import SessionManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    # The Coordinator keeps its memory store under the working directory
+    monkeypatch.chdir(tmp_path)
+    manager = SessionManager(max_history=3, idle_timeout=60, max_sessions=100)
+    yield manager
+    manager.coordinator.memory_agent.close()
+
+
+def test_sessions_keep_separate_bounded_histories(manager):
+    for n in range(5):
+        manager.handle_query("alice", f"research topic {n}")
+    manager.handle_query("bob", "research neural networks")
+    alice, bob = manager.get("alice"), manager.get("bob")
+    assert list(alice.history) == ["research topic 2", "research topic 3", "research topic 4"]
+    assert list(bob.history) == ["research neural networks"]
+    assert alice.query_count == 5 and bob.query_count == 1
+    # Both sessions share one set of agents
+    assert manager.coordinator.query_history == []
+
+
+def test_context_queries_only_see_their_own_session(manager):
+    manager.handle_query("alice", "research optimization techniques")
+    manager.handle_query("bob", "research neural networks")
+    result = manager.handle_query("alice", "what did we discuss earlier")
+    assert result["source"] == "context"
+    assert result["response"]["previous_topics"] == ["research optimization techniques"]
+
+
+def test_idle_sessions_are_evicted(manager):
+    alice = manager.get("alice")
+    manager.get("bob")
+    alice.last_active -= 120
+    assert manager.evict_idle() == 1
+    assert len(manager) == 1
+    report = manager.memory_report()
+    assert report["sessions"] == 1 and report["evicted"] == 1
+    assert report["per_session"]["bob"]["bytes"] > 0
+
+
+def test_session_cap_drops_least_recently_active(manager):
+    manager.max_sessions = 2
+    for name in ("a", "b", "c"):
+        manager.get(name)
+    assert len(manager) == 2 and manager.evicted == 1
+    assert "a" not in manager and "c" in manager